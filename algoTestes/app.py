@@ -1,299 +1,486 @@
 from flask import Flask, request, redirect, render_template, url_for
 import pandas as pd
+import numpy as np
 import os
+import io
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pattern_analyzer
 import index_base_pattern
 import avg_range
+from numba_support import njit, NUMBA_AVAILABLE
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
+# Columns of an uploaded CSV that the analyses use; anything else is not parsed
+ANALYSIS_COLUMNS = frozenset(['Date', 'Price', 'Open', 'High', 'Low', 'Change %'])
+
+# Trading days in calendar order; grouping on these categories works on int8 codes
+WEEKDAY_DTYPE = pd.CategoricalDtype(
+    categories=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'], ordered=True)
+
+# One report line per weekday, filled row by row from the day-of-week statistics
+DAY_OF_WEEK_COLUMNS = {'avg_change': 2, 'positive_pct': 1, 'negative_pct': 1, 'avg_gain': 2, 'avg_loss': 2}
+DAY_OF_WEEK_TEMPLATE = "\n".join(
+    f"  {day + ':':<11}Avg Change: {{}}%  Positive: {{}}%  Negative: {{}}%  Avg Gain: {{}}%  Avg Loss: {{}}%"
+    for day in WEEKDAY_DTYPE.categories)
+
+# Worker threads for the independent pattern aggregations; pandas/NumPy release the GIL
+pattern_executor = ThreadPoolExecutor(max_workers=4)
+
+class FileContents:
+    """
+    The bytes of an uploaded file, read once, together with their digest.
+    
+    Instances compare and hash by (path, digest) so they can key the lru caches,
+    while a cache miss parses exactly the bytes the digest was taken from.
+    """
+    __slots__ = ('file_path', 'data', 'digest')
+    
+    def __init__(self, file_path, data):
+        self.file_path = file_path
+        self.data = data
+        self.digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    def _key(self):
+        return (self.file_path, self.digest)
+    
+    def __eq__(self, other):
+        if not isinstance(other, FileContents):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
+
+def read_file(file_path):
+    """
+    Read a file once so its digest and parsed data always describe the same bytes.
+    
+    Parameters:
+    file_path (str): Path to the file
+    
+    Returns:
+    FileContents: The file's bytes and their BLAKE2b digest
+    """
+    with open(file_path, 'rb') as f:
+        return FileContents(file_path, f.read())
+
+@functools.lru_cache(maxsize=32)
+def _read_csv_cached(contents):
+    """Parse and clean a CSV once per (path, content digest) pair."""
+    # Skip columns no analysis reads (e.g. 'Vol.') and let the C parser strip
+    # thousands separators so price columns arrive as floats
+    df = pd.read_csv(io.BytesIO(contents.data), thousands=',', usecols=lambda col: col in ANALYSIS_COLUMNS)
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'])
+    
+    # Convert percentage strings to float numbers if they are strings
+    if 'Change %' in df.columns and df['Change %'].dtype == object:
+        df['Change %'] = df['Change %'].str.rstrip('%').astype('float')
+    
+    # Make sure price columns are floats, even if the parser left them as strings
+    for col in ['Price', 'High', 'Low']:
+        if col in df.columns:
+            if df[col].dtype == object:  # String type
+                df[col] = df[col].str.replace(',', '').astype('float')
+            elif not pd.api.types.is_float_dtype(df[col]):
+                df[col] = df[col].astype('float')
+    return df
+
+def load_csv(contents):
+    """
+    Load an uploaded CSV file with 'Date' parsed and 'Change %' and price columns
+    converted to floats, reusing the cleaned data while the file is unchanged.
+    
+    Parameters:
+    contents (FileContents): The file as returned by read_file
+    
+    Returns:
+    pandas.DataFrame: A fresh copy of the cleaned data that callers may modify
+    """
+    return _read_csv_cached(contents).copy()
+
+def find_longest_streak(changes):
+    """
+    Find the longest run of consecutive positive or negative changes.
+    
+    Parameters:
+    changes (numpy.ndarray): 'Change %' values in row order
+    
+    Returns:
+    tuple: (length, streak type, first row position, last row position) of the longest run
+    """
+    # Run-length encode the signs; neutral (or missing) days never extend a streak
+    signs = np.sign(np.nan_to_num(changes)).astype(np.int8)
+    boundaries = np.concatenate(([0], np.flatnonzero(signs[1:] != signs[:-1]) + 1, [len(signs)]))
+    run_lengths = np.diff(boundaries)
+    run_signs = signs[boundaries[:-1]]
+    run_lengths[run_signs == 0] = 0
+    
+    best = run_lengths.argmax()
+    if run_lengths[best] < 2:
+        # No two consecutive days share a sign, report the first day on its own
+        return 1, 'positive' if changes[0] > 0 else 'negative', 0, 0
+    
+    streak_type = 'positive' if run_signs[best] > 0 else 'negative'
+    return int(run_lengths[best]), streak_type, int(boundaries[best]), int(boundaries[best + 1] - 1)
+
+@njit(cache=True)
+def _streak_kernel(changes, bounds):
+    """Single pass over all segments computing each segment's longest streak."""
+    n_segments = len(bounds) - 1
+    lengths = np.ones(n_segments, np.int64)
+    signs = np.empty(n_segments, np.int8)
+    firsts = np.empty(n_segments, np.int64)
+    lasts = np.empty(n_segments, np.int64)
+    
+    for g in range(n_segments):
+        start = bounds[g]
+        signs[g] = 1 if changes[start] > 0 else -1
+        firsts[g] = start
+        lasts[g] = start
+        run = 1
+        run_start = start
+        for i in range(start + 1, bounds[g + 1]):
+            if (changes[i] > 0 and changes[i - 1] > 0) or (changes[i] < 0 and changes[i - 1] < 0):
+                run += 1
+                if run > lengths[g]:
+                    lengths[g] = run
+                    signs[g] = 1 if changes[i] > 0 else -1
+                    firsts[g] = run_start
+                    lasts[g] = i
+            else:
+                run = 1
+                run_start = i
+    
+    return lengths, signs, firsts, lasts
+
+def find_longest_streaks(changes, bounds):
+    """
+    Find the longest streak in each contiguous segment of an array of changes.
+    
+    Parameters:
+    changes (numpy.ndarray): 'Change %' values, grouped into contiguous segments
+    bounds (numpy.ndarray): Segment boundaries; segment g spans bounds[g]:bounds[g + 1]
+    
+    Returns:
+    tuple: Per-segment lengths, streak types and first/last row positions (absolute)
+    """
+    changes = np.ascontiguousarray(changes, dtype=np.float64)
+    bounds = np.ascontiguousarray(bounds, dtype=np.int64)
+    
+    if NUMBA_AVAILABLE:
+        lengths, signs, firsts, lasts = _streak_kernel(changes, bounds)
+        types = ['positive' if sign > 0 else 'negative' for sign in signs]
+        return lengths, types, firsts, lasts
+    
+    # Without numba, run the NumPy implementation segment by segment
+    lengths, types, firsts, lasts = [], [], [], []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        length, streak_type, first, last = find_longest_streak(changes[start:end])
+        lengths.append(length)
+        types.append(streak_type)
+        firsts.append(start + first)
+        lasts.append(start + last)
+    return lengths, types, firsts, lasts
+
+def day_of_week_patterns(df, weekly_changes):
+    """
+    Summarize the day-of-week statistics and the runs of same-signed weeks.
+    
+    Parameters:
+    df (pandas.DataFrame): Weekday rows with 'Change %', 'Day_of_Week', 'Is_Positive' and 'Is_Negative'
+    weekly_changes (pandas.Series): Total 'Change %' of every week in chronological order
+    
+    Returns:
+    dict: Per-day statistics table and the consecutive positive/negative week counts
+    """
+    # Mask gains/losses with the precomputed sign flags so every statistic below
+    # is a builtin reducer (masked values are skipped as NaN by mean);
+    # the selection is a copy of four columns, so the helpers never touch the df
+    # shared with the other workers
+    changes = df['Change %']
+    day_df = df[['Day_of_Week', 'Change %', 'Is_Positive', 'Is_Negative']].assign(
+        Gain=changes.where(df['Is_Positive'].astype(bool)),
+        Loss=changes.where(df['Is_Negative'].astype(bool)),
+    )
+    
+    # Group by day of week and calculate statistics in a single pass
+    day_of_week_stats = day_df.groupby('Day_of_Week', observed=True, sort=False).agg(
+        avg_change=('Change %', 'mean'),
+        total_days=('Change %', 'count'),
+        positive_days=('Is_Positive', 'sum'),
+        negative_days=('Is_Negative', 'sum'),
+        avg_gain=('Gain', 'mean'),
+        avg_loss=('Loss', 'mean'),
+    )
+    day_of_week_stats['positive_pct'] = (day_of_week_stats['positive_days'] / day_of_week_stats['total_days']) * 100
+    day_of_week_stats['negative_pct'] = (day_of_week_stats['negative_days'] / day_of_week_stats['total_days']) * 100
+    
+    # Days without any gain or loss report an average of 0
+    day_of_week_stats[['avg_gain', 'avg_loss']] = day_of_week_stats[['avg_gain', 'avg_loss']].fillna(0)
+    
+    # Reindex to get days in correct order
+    day_order = list(WEEKDAY_DTYPE.categories)
+    day_of_week_stats = day_of_week_stats.reindex(day_order)
+    
+    # Get the list of weekly changes in chronological order
+    weekly_change_list = weekly_changes.to_numpy()
+    
+    # Count consecutive positive and negative weeks: every week after the first
+    # one in a run of same-signed weeks counts once (neutral weeks break runs)
+    week_signs = np.sign(weekly_change_list).astype(np.int8)
+    run_starts = np.flatnonzero(np.r_[True, week_signs[1:] != week_signs[:-1]])
+    run_lengths = np.diff(np.r_[run_starts, len(week_signs)])
+    run_signs = week_signs[run_starts]
+    consecutive_positive_weeks = int((run_lengths[run_signs == 1] - 1).sum())
+    consecutive_negative_weeks = int((run_lengths[run_signs == -1] - 1).sum())
+    
+    return {
+        'day_stats': day_of_week_stats,
+        'consecutive_positive_weeks': consecutive_positive_weeks,
+        'consecutive_negative_weeks': consecutive_negative_weeks
+    }
+
+def range_patterns(df):
+    """
+    Summarize the daily price ranges.
+    
+    Parameters:
+    df (pandas.DataFrame): Weekday rows with 'High' and 'Low' columns
+    
+    Returns:
+    dict: Average daily range in price points
+    """
+    daily_range = df['High'] - df['Low']
+    return {
+        'avg_daily_range': round(daily_range.mean(), 2),
+    }
+
+def weekly_patterns(weekly_stats):
+    """
+    Summarize the weekly ranges and classify weeks by their total change.
+    
+    Parameters:
+    weekly_stats (pandas.DataFrame): Per-week 'highest_price', 'lowest_price' and 'week_change'
+    
+    Returns:
+    dict: Average weekly range and the number of strong/weak positive/negative weeks
+    """
+    # Calculate true weekly ranges (highest high - lowest low for each week)
+    weekly_ranges = weekly_stats['highest_price'] - weekly_stats['lowest_price']
+    
+    # Calculate weekly total changes
+    weekly_changes = weekly_stats['week_change']
+    
+    return {
+        'avg_weekly_range': round(weekly_ranges.mean(), 2),
+        'strong_positive_weeks': len(weekly_changes[weekly_changes > 2.0]),  # Weeks with >2% positive change
+        'weak_positive_weeks': len(weekly_changes[(weekly_changes > 0) & (weekly_changes < 2.0)]),  # Weeks with 0-2% positive change
+        'strong_negative_weeks': len(weekly_changes[weekly_changes < -2.0]),  # Weeks with <-2% negative change
+        'weak_negative_weeks': len(weekly_changes[(weekly_changes < 0) & (weekly_changes > -2.0)])  # Weeks with 0 to -2% negative change
+    }
+
 def analyze_csv(file_path):
+    """Analyze an uploaded CSV file, reusing the report while its contents are unchanged."""
+    try:
+        contents = read_file(file_path)
+    except FileNotFoundError:
+        return "Error: File not found."
+    return _analyze_csv_cached(contents)
+
+@functools.lru_cache(maxsize=32)
+def _analyze_csv_cached(contents):
+    """Build the analysis report for a file; its digest keys the cache on its contents."""
     try:
         # Read the CSV file
-        df = pd.read_csv(file_path)
+        df = load_csv(contents)
         
         # Check if "Change %" column exists
         if 'Change %' not in df.columns:
             return "No 'Change %' column found in the CSV file."
         
-        # Convert dates to datetime and create day of week column
-        df['Date'] = pd.to_datetime(df['Date'])
-        df['Day_of_Week'] = df['Date'].dt.strftime('%A')  # Full day name
-        
-        # Filter out weekends (only keep Monday-Friday)
+        # Filter out weekends (only keep Monday-Friday, dates are parsed by load_csv)
+        # and sort chronologically once; the stable sort keeps ties in file order and
+        # the fresh RangeIndex makes every idxmax/idxmin label below a row position
         df = df[df['Date'].dt.dayofweek < 5]  # 0=Monday, 4=Friday
+        df = df.sort_values('Date', kind='mergesort').reset_index(drop=True)
+        
+        # Format the dates once; every report line below reuses these strings
+        df['Day_of_Week'] = df['Date'].dt.day_name().astype(WEEKDAY_DTYPE)  # Full day name
+        df['Date_Str'] = df['Date'].dt.strftime('%A, %d/%m/%Y')
         
-        # Convert percentage strings to float numbers if they are strings
-        if df['Change %'].dtype == object:  # Check if it's a string type
-            df['Change %'] = df['Change %'].str.rstrip('%').astype('float')
-        
-        # Process price columns if they exist
-        for col in ['Price', 'High', 'Low']:
-            if col in df.columns:
-                # Check if the column is string type before applying string methods
-                if df[col].dtype == object:  # String type
-                    df[col] = df[col].str.replace(',', '').astype('float')
-                elif not pd.api.types.is_float_dtype(df[col]):
-                    # If it's not already float, convert it
-                    df[col] = df[col].astype('float')
-        
-        total_count = len(df['Change %'].dropna())
+        # Count on the raw array; NaN compares False, so no dropna() is needed
+        arr = df['Change %'].to_numpy(dtype=np.float64, copy=False)
+        total_count = int(np.count_nonzero(~np.isnan(arr)))
         if total_count == 0:
             return "No valid data found in the Change % column."
         
+        # Classify every day once; the masks and their int8 columns are reused by the
+        # overall counts and averages, the weekly breakdown and the day-of-week stats
+        pos_mask = arr > 0
+        neg_mask = arr < 0
+        df['Is_Positive'] = pos_mask.view(np.int8)
+        df['Is_Negative'] = neg_mask.view(np.int8)
+        
         # Calculate positive and negative percentages
-        positive_count = len(df[df['Change %'] > 0]['Change %'].dropna())
-        negative_count = len(df[df['Change %'] < 0]['Change %'].dropna())
-        neutral_count = len(df[df['Change %'] == 0]['Change %'].dropna())
+        positive_count = int(np.count_nonzero(pos_mask))
+        negative_count = int(np.count_nonzero(neg_mask))
+        neutral_count = total_count - positive_count - negative_count
         
         positive_percent = (positive_count / total_count) * 100
         negative_percent = (negative_count / total_count) * 100
         neutral_percent = (neutral_count / total_count) * 100
         
         # Calculate average positive and negative changes
-        avg_positive_change = df[df['Change %'] > 0]['Change %'].mean()
-        avg_negative_change = df[df['Change %'] < 0]['Change %'].mean()
+        avg_positive_change = arr[pos_mask].mean() if positive_count > 0 else np.nan
+        avg_negative_change = arr[neg_mask].mean() if negative_count > 0 else np.nan
 
         # Weekly Analysis
         # Create a week number for each date (Monday as start of week)
-        df['Week_Number'] = df['Date'].dt.isocalendar().week
-        df['Year'] = df['Date'].dt.isocalendar().year
-        
-        # Create unique week identifier (year + week number)
-        df['Week_ID'] = df['Year'].astype(str) + '-' + df['Week_Number'].astype(str)
-        
-        # Group data by weeks
-        weekly_groups = df.groupby('Week_ID')
+        iso = df['Date'].dt.isocalendar()
+        
+        # Create unique week identifier as an integer (e.g. 202405 for week 5 of 2024);
+        # it sorts like (year, week), so every weekly aggregation shares this one key
+        df['Week_ID'] = iso['year'].to_numpy(np.int32) * 100 + iso['week'].to_numpy(np.int32)
+        
+        # Group data by weeks (rows are in date order so ties resolve to the earliest day);
+        # copy only the columns the weekly breakdown reads and add the helpers to that
+        # copy, so df itself is left untouched for the pattern workers
+        weekly_df = df[['Date', 'Date_Str', 'Day_of_Week', 'Change %', 'High', 'Low',
+                        'Week_ID', 'Is_Positive', 'Is_Negative']].assign(
+            Is_Neutral=df['Change %'] == 0,
+            Positive_Change=df['Change %'].where(pos_mask),
+            Negative_Change=df['Change %'].where(neg_mask),
+            Abs_Change=df['Change %'].abs(),
+        )
+        weekly_groups = weekly_df.groupby('Week_ID')
+        
+        # Calculate all weekly metrics in a single grouped aggregation
+        weekly_stats = weekly_groups.agg(
+            total_days=('Change %', 'size'),
+            positive_days=('Is_Positive', 'sum'),
+            negative_days=('Is_Negative', 'sum'),
+            neutral_days=('Is_Neutral', 'sum'),
+            avg_positive=('Positive_Change', 'mean'),
+            avg_negative=('Negative_Change', 'mean'),
+            best_idx=('Change %', 'idxmax'),
+            worst_idx=('Change %', 'idxmin'),
+            highest_idx=('High', 'idxmax'),
+            lowest_idx=('Low', 'idxmin'),
+            volatile_idx=('Abs_Change', 'idxmax'),
+            highest_price=('High', 'max'),
+            lowest_price=('Low', 'min'),
+            week_change=('Change %', 'sum'),
+            first_date=('Date', 'first'),
+            last_date=('Date', 'last'),
+        )
+        
+        # The pattern aggregations only read df and the weekly stats, so run them
+        # alongside the weekly breakdown below
+        pattern_futures = {
+            'day_of_week': pattern_executor.submit(day_of_week_patterns, df, weekly_stats['week_change']),
+            'range': pattern_executor.submit(range_patterns, df),
+            'weekly': pattern_executor.submit(weekly_patterns, weekly_stats),
+        }
         
-
+        # Gather the best, worst, highest, lowest and most volatile days of every week at once
+        weekly_date_strs = weekly_df['Date_Str'].to_numpy()
+        weekly_changes_arr = weekly_df['Change %'].to_numpy()
+        highs = weekly_df['High'].to_numpy()
+        lows = weekly_df['Low'].to_numpy()
+        day_rows = weekly_stats[['best_idx', 'worst_idx', 'highest_idx', 'lowest_idx', 'volatile_idx']].to_numpy()
+        best_rows, worst_rows, _, _, volatile_rows = day_rows.T
+        best_dates, worst_dates, highest_dates, lowest_dates, volatile_dates = weekly_date_strs[day_rows].T
+        best_changes = weekly_changes_arr[best_rows]
+        worst_changes = weekly_changes_arr[worst_rows]
+        volatile_changes = weekly_changes_arr[volatile_rows]
+        volatile_ranges = highs[volatile_rows] - lows[volatile_rows]
+        
+        total_days = weekly_stats['total_days'].to_numpy()
+        positive_days = weekly_stats['positive_days'].to_numpy()
+        negative_days = weekly_stats['negative_days'].to_numpy()
+        neutral_days = weekly_stats['neutral_days'].to_numpy()
+        avg_positive = weekly_stats['avg_positive'].to_numpy()
+        avg_negative = weekly_stats['avg_negative'].to_numpy()
+        highest_prices = weekly_stats['highest_price'].to_numpy()
+        lowest_prices = weekly_stats['lowest_price'].to_numpy()
+        week_changes = weekly_stats['week_change'].to_numpy()
+        start_dates = weekly_stats['first_date'].dt.strftime('%d/%m/%Y').to_numpy()
+        end_dates = weekly_stats['last_date'].dt.strftime('%d/%m/%Y').to_numpy()
+        
+        # Calculate every weekly streak in one pass; in date order each week is a
+        # contiguous block of rows, in the same order as the groups
+        week_ids = weekly_df['Week_ID'].to_numpy()
+        week_bounds = np.r_[0, np.flatnonzero(week_ids[1:] != week_ids[:-1]) + 1, len(week_ids)]
+        week_streaks, week_streak_types, week_streak_firsts, week_streak_lasts = find_longest_streaks(
+            weekly_changes_arr, week_bounds)
+        
+        # Generate the daily breakdown line of every day from the column arrays
+        daily_range_points = highs - lows
+        daily_range_percent = (daily_range_points / lows) * 100
+        daily_lines = [
+            f"\n  {day_name}: Change: {round(change, 2)}%, "
+            f"Range: {round(range_percent, 2)}% (${range_points:,.2f}), "
+            f"High: ${high:,.2f}, Low: ${low:,.2f}"
+            for day_name, change, range_percent, range_points, high, low in zip(
+                weekly_df['Day_of_Week'].to_numpy(), weekly_changes_arr, daily_range_percent,
+                daily_range_points, highs, lows)
+        ]
         
         weekly_analysis = []
         
-        for week_id, week_data in weekly_groups:
-            week_data = week_data.sort_values('Date')  # Ensure data is sorted by date
-            
-            # Calculate weekly metrics
-            week_positive_days = len(week_data[week_data['Change %'] > 0])
-            week_negative_days = len(week_data[week_data['Change %'] < 0])
-            week_neutral_days = len(week_data[week_data['Change %'] == 0])
-            
-            # Calculate average positive and negative changes for the week
-            week_avg_positive = week_data[week_data['Change %'] > 0]['Change %'].mean() if len(week_data[week_data['Change %'] > 0]) > 0 else 0
-            week_avg_negative = week_data[week_data['Change %'] < 0]['Change %'].mean() if len(week_data[week_data['Change %'] < 0]) > 0 else 0
-            
-            # Find best and worst days
-            best_day_idx = week_data['Change %'].idxmax()
-            worst_day_idx = week_data['Change %'].idxmin()
-            best_day = {
-                'date': week_data.loc[best_day_idx, 'Date'].strftime('%A, %d/%m/%Y'),
-                'change': week_data.loc[best_day_idx, 'Change %']
-            }
-            worst_day = {
-                'date': week_data.loc[worst_day_idx, 'Date'].strftime('%A, %d/%m/%Y'),
-                'change': week_data.loc[worst_day_idx, 'Change %']
-            }
-            
-            # Calculate weekly streak
-            week_changes = week_data['Change %'].values
-            week_dates = week_data['Date'].dt.strftime('%A, %d/%m/%Y').values
-            current_week_streak = 1
-            max_week_streak = 1
-            week_streak_type = 'positive' if week_changes[0] > 0 else 'negative'
-            week_streak_start = week_dates[0]
-            week_streak_end = week_dates[0]
-            current_week_start = week_dates[0]
-            
-            for i in range(1, len(week_changes)):
-                if (week_changes[i] > 0 and week_changes[i-1] > 0) or (week_changes[i] < 0 and week_changes[i-1] < 0):
-                    current_week_streak += 1
-                    if current_week_streak > max_week_streak:
-                        max_week_streak = current_week_streak
-                        week_streak_type = 'positive' if week_changes[i] > 0 else 'negative'
-                        week_streak_start = current_week_start
-                        week_streak_end = week_dates[i]
-                else:
-                    current_week_streak = 1
-                    current_week_start = week_dates[i]
-            
-            # Find highest and lowest points with specific days
-            highest_idx = week_data['High'].idxmax()
-            lowest_idx = week_data['Low'].idxmin()
-            week_highest_day = week_data.loc[highest_idx, 'Date'].strftime('%A, %d/%m/%Y')
-            week_lowest_day = week_data.loc[lowest_idx, 'Date'].strftime('%A, %d/%m/%Y')
-            
-            # Calculate daily range for most volatile day
-            week_data['Abs_Change'] = week_data['Change %'].abs()
-            most_volatile_idx = week_data['Abs_Change'].idxmax()
-            most_volatile_date = week_data.loc[most_volatile_idx, 'Date'].strftime('%A, %d/%m/%Y')
-            most_volatile_change = week_data.loc[most_volatile_idx, 'Change %']
-            most_volatile_high = week_data.loc[most_volatile_idx, 'High']
-            most_volatile_low = week_data.loc[most_volatile_idx, 'Low']
-            most_volatile_range = most_volatile_high - most_volatile_low
-            
-            # Calculate weekly change by summing all daily changes
-            week_change = week_data['Change %'].sum()
-            
-            # Generate daily breakdown
-            daily_breakdown = ""
-            for _, day in week_data.iterrows():
-                daily_range_points = day['High'] - day['Low']
-                daily_range_percent = (daily_range_points / day['Low']) * 100
-                daily_breakdown += f"\n  {day['Date'].strftime('%A')}: Change: {round(day['Change %'], 2)}%, "
-                daily_breakdown += f"Range: {round(daily_range_percent, 2)}% (${daily_range_points:,.2f}), "
-                daily_breakdown += f"High: ${day['High']:,.2f}, Low: ${day['Low']:,.2f}"
+        for i in range(len(weekly_stats)):
+            daily_breakdown = "".join(daily_lines[week_bounds[i]:week_bounds[i + 1]])
 
             weekly_analysis.append({
-                'start_date': week_data.iloc[0]['Date'].strftime('%d/%m/%Y'),
-                'end_date': week_data.iloc[-1]['Date'].strftime('%d/%m/%Y'),
-                'total_days': len(week_data),
-                'positive_days': week_positive_days,
-                'negative_days': week_negative_days,
-                'neutral_days': week_neutral_days,
-                'avg_positive': week_avg_positive,
-                'avg_negative': week_avg_negative,
-                'best_day': best_day,
-                'worst_day': worst_day,
-                'highest_point': {'price': week_data['High'].max(), 'date': week_highest_day},
-                'lowest_point': {'price': week_data['Low'].min(), 'date': week_lowest_day},
-                'most_volatile_day': most_volatile_date,
-                'most_volatile_change': most_volatile_change,
-                'most_volatile_range': most_volatile_range,
-                'week_change': week_change,
-                'max_streak': max_week_streak,
-                'streak_type': week_streak_type,
-                'streak_start': week_streak_start,
-                'streak_end': week_streak_end,
+                'start_date': start_dates[i],
+                'end_date': end_dates[i],
+                'total_days': int(total_days[i]),
+                'positive_days': int(positive_days[i]),
+                'negative_days': int(negative_days[i]),
+                'neutral_days': int(neutral_days[i]),
+                # Weeks without positive or negative days report an average of 0
+                'avg_positive': avg_positive[i] if positive_days[i] > 0 else 0,
+                'avg_negative': avg_negative[i] if negative_days[i] > 0 else 0,
+                'best_day': {'date': best_dates[i], 'change': best_changes[i]},
+                'worst_day': {'date': worst_dates[i], 'change': worst_changes[i]},
+                'highest_point': {'price': highest_prices[i], 'date': highest_dates[i]},
+                'lowest_point': {'price': lowest_prices[i], 'date': lowest_dates[i]},
+                'most_volatile_day': volatile_dates[i],
+                'most_volatile_change': volatile_changes[i],
+                'most_volatile_range': volatile_ranges[i],
+                'week_change': week_changes[i],
+                'max_streak': int(week_streaks[i]),
+                'streak_type': week_streak_types[i],
+                'streak_start': weekly_date_strs[week_streak_firsts[i]],
+                'streak_end': weekly_date_strs[week_streak_lasts[i]],
                 'daily_breakdown': daily_breakdown
             })
 
         # Calculate longest streak (keeping existing code)
-        changes = df['Change %'].values
-        dates = df['Date'].dt.strftime('%A, %d/%m/%Y').values
-        current_streak = 1
-        max_streak = 1
-        streak_type = 'positive' if changes[0] > 0 else 'negative'
-        streak_start_date = dates[0]
-        streak_end_date = dates[0]
-        current_start_date = dates[0]
-        
-        for i in range(1, len(changes)):
-            if (changes[i] > 0 and changes[i-1] > 0) or (changes[i] < 0 and changes[i-1] < 0):
-                current_streak += 1
-                if current_streak > max_streak:
-                    max_streak = current_streak
-                    streak_type = 'positive' if changes[i] > 0 else 'negative'
-                    streak_end_date = current_start_date
-                    streak_start_date = dates[i]
-            else:
-                current_streak = 1
-                current_start_date = dates[i]
-
-        # Calculate pattern analysis
-        patterns = {}
-        
-        # Day-of-week patterns
-        # Group by day of week and calculate statistics
-        day_of_week_stats = df.groupby('Day_of_Week')['Change %'].agg(['mean', 'count', lambda x: (x > 0).sum(), lambda x: (x < 0).sum()])
-        day_of_week_stats.columns = ['avg_change', 'total_days', 'positive_days', 'negative_days']
-        day_of_week_stats['positive_pct'] = (day_of_week_stats['positive_days'] / day_of_week_stats['total_days']) * 100
-        day_of_week_stats['negative_pct'] = (day_of_week_stats['negative_days'] / day_of_week_stats['total_days']) * 100
-        
-        # Calculate average gain and loss for each day of the week
-        # First, create a function to calculate average gain and loss
-        def calc_avg_gain_loss(group):
-            positive_changes = group[group > 0]
-            negative_changes = group[group < 0]
-            avg_gain = positive_changes.mean() if len(positive_changes) > 0 else 0
-            avg_loss = negative_changes.mean() if len(negative_changes) > 0 else 0
-            return pd.Series({'avg_gain': avg_gain, 'avg_loss': avg_loss})
-        
-        # Apply the function to each day of the week
-        day_gain_loss = df.groupby('Day_of_Week')['Change %'].apply(calc_avg_gain_loss).unstack()
-        day_of_week_stats = day_of_week_stats.join(day_gain_loss)
-        
-        # Reindex to get days in correct order
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        day_of_week_stats = day_of_week_stats.reindex(day_order)
-        
-        # Calculate weekly changes and create a chronological series of weekly changes
-        # First, get the sum of changes for each week
-        weekly_changes_df = df.groupby(['Year', 'Week_Number'])['Change %'].sum().reset_index()
-        
-        # Sort by year and week to get chronological order
-        weekly_changes_df = weekly_changes_df.sort_values(['Year', 'Week_Number'])
-        
-        # Get the list of weekly changes in chronological order
-        weekly_change_list = weekly_changes_df['Change %'].values
-        
-        # Count consecutive positive and negative weeks
-        consecutive_positive_weeks = 0
-        consecutive_negative_weeks = 0
-        current_positive_streak = 0
-        current_negative_streak = 0
-        
-        for change in weekly_change_list:
-            if change > 0:
-                # Reset negative streak
-                current_negative_streak = 0
-                # Increment positive streak
-                current_positive_streak += 1
-                # If we have at least 2 consecutive positive weeks, count it
-                if current_positive_streak >= 2:
-                    consecutive_positive_weeks += 1
-            elif change < 0:
-                # Reset positive streak
-                current_positive_streak = 0
-                # Increment negative streak
-                current_negative_streak += 1
-                # If we have at least 2 consecutive negative weeks, count it
-                if current_negative_streak >= 2:
-                    consecutive_negative_weeks += 1
-            else:  # change == 0
-                # Reset both streaks for neutral weeks
-                current_positive_streak = 0
-                current_negative_streak = 0
-        
-        day_of_week_patterns = {
-            'day_stats': day_of_week_stats,
-            'consecutive_positive_weeks': consecutive_positive_weeks,
-            'consecutive_negative_weeks': consecutive_negative_weeks
-        }
-        patterns['day_of_week'] = day_of_week_patterns
-        
-        # 3. Range patterns
-        df['daily_range'] = df['High'] - df['Low']
-        df['range_percent'] = (df['daily_range'] / df['Low']) * 100
-        range_patterns = {
-            'avg_daily_range': round(df['daily_range'].mean(), 2),
-        }
-        patterns['range'] = range_patterns
-        
-        # 5. Weekly patterns
-        weekly_groups_patterns = df.groupby(['Year', 'Week_Number'])
-        
-        # Calculate true weekly ranges (highest high - lowest low for each week)
-        weekly_highs = weekly_groups_patterns['High'].max()
-        weekly_lows = weekly_groups_patterns['Low'].min()
-        weekly_ranges = weekly_highs - weekly_lows
-        
-        # Calculate weekly total changes
-        weekly_changes = weekly_groups_patterns['Change %'].sum()
-        
-        weekly_patterns = {
-            'avg_weekly_range': round(weekly_ranges.mean(), 2),
-            'strong_positive_weeks': len(weekly_changes[weekly_changes > 2.0]),  # Weeks with >2% positive change
-            'weak_positive_weeks': len(weekly_changes[(weekly_changes > 0) & (weekly_changes < 2.0)]),  # Weeks with 0-2% positive change
-            'strong_negative_weeks': len(weekly_changes[weekly_changes < -2.0]),  # Weeks with <-2% negative change
-            'weak_negative_weeks': len(weekly_changes[(weekly_changes < 0) & (weekly_changes > -2.0)])  # Weeks with 0 to -2% negative change
-        }
-        patterns['weekly'] = weekly_patterns
+        dates = df['Date_Str'].to_numpy()
+        lengths, types, firsts, lasts = find_longest_streaks(arr, [0, len(arr)])
+        max_streak, streak_type, first, last = int(lengths[0]), types[0], firsts[0], lasts[0]
+        streak_start_date = dates[first]
+        streak_end_date = dates[last]
+
+        # Collect the pattern analysis
+        patterns = {name: future.result() for name, future in pattern_futures.items()}
 
         # Sort weekly analysis from newest to oldest using the end_date
-        weekly_analysis.sort(key=lambda x: pd.to_datetime(x['end_date'], format='%d/%m/%Y'), reverse=True)
+        newest_first = np.argsort(weekly_stats['last_date'].to_numpy(), kind='stable')[::-1]
+        weekly_analysis = [weekly_analysis[i] for i in newest_first]
 
-        # Generate the output string for overall results
-        output = f"""
+        # Round the day-of-week table once and fill the template positionally
+        day_of_week_values = patterns['day_of_week']['day_stats'][list(DAY_OF_WEEK_COLUMNS)].round(DAY_OF_WEEK_COLUMNS)
+        day_of_week_lines = DAY_OF_WEEK_TEMPLATE.format(*day_of_week_values.to_numpy().ravel())
+        
+        # Generate the output for overall results; pieces are joined once at the end
+        output_parts = [f"""
 Analysis Results ({df['Date'].min().strftime('%d/%m/%Y')} - {df['Date'].max().strftime('%d/%m/%Y')} | {total_count} Trading Days):
 ==================================================
 Overall Distribution:
@@ -309,17 +496,13 @@ Longest Overall Streak:
   {max_streak} days ({streak_type}) from {streak_start_date} to {streak_end_date}
 
 Overall High/Low:
-  Highest Price: {df.loc[df['High'].idxmax(), 'High']} on {df.loc[df['High'].idxmax(), 'Date'].strftime('%A, %d/%m/%Y')}
-  Lowest Price:  {df.loc[df['Low'].idxmin(), 'Low']} on {df.loc[df['Low'].idxmin(), 'Date'].strftime('%A, %d/%m/%Y')}
+  Highest Price: {df.loc[df['High'].idxmax(), 'High']} on {df.loc[df['High'].idxmax(), 'Date_Str']}
+  Lowest Price:  {df.loc[df['Low'].idxmin(), 'Low']} on {df.loc[df['Low'].idxmin(), 'Date_Str']}
 
 Pattern Analysis:
 =================
 Day-of-Week Patterns:
-  Monday:    Avg Change: {round(patterns['day_of_week']['day_stats'].loc['Monday', 'avg_change'], 2)}%  Positive: {round(patterns['day_of_week']['day_stats'].loc['Monday', 'positive_pct'], 1)}%  Negative: {round(patterns['day_of_week']['day_stats'].loc['Monday', 'negative_pct'], 1)}%  Avg Gain: {round(patterns['day_of_week']['day_stats'].loc['Monday', 'avg_gain'], 2)}%  Avg Loss: {round(patterns['day_of_week']['day_stats'].loc['Monday', 'avg_loss'], 2)}%
-  Tuesday:   Avg Change: {round(patterns['day_of_week']['day_stats'].loc['Tuesday', 'avg_change'], 2)}%  Positive: {round(patterns['day_of_week']['day_stats'].loc['Tuesday', 'positive_pct'], 1)}%  Negative: {round(patterns['day_of_week']['day_stats'].loc['Tuesday', 'negative_pct'], 1)}%  Avg Gain: {round(patterns['day_of_week']['day_stats'].loc['Tuesday', 'avg_gain'], 2)}%  Avg Loss: {round(patterns['day_of_week']['day_stats'].loc['Tuesday', 'avg_loss'], 2)}%
-  Wednesday: Avg Change: {round(patterns['day_of_week']['day_stats'].loc['Wednesday', 'avg_change'], 2)}%  Positive: {round(patterns['day_of_week']['day_stats'].loc['Wednesday', 'positive_pct'], 1)}%  Negative: {round(patterns['day_of_week']['day_stats'].loc['Wednesday', 'negative_pct'], 1)}%  Avg Gain: {round(patterns['day_of_week']['day_stats'].loc['Wednesday', 'avg_gain'], 2)}%  Avg Loss: {round(patterns['day_of_week']['day_stats'].loc['Wednesday', 'avg_loss'], 2)}%
-  Thursday:  Avg Change: {round(patterns['day_of_week']['day_stats'].loc['Thursday', 'avg_change'], 2)}%  Positive: {round(patterns['day_of_week']['day_stats'].loc['Thursday', 'positive_pct'], 1)}%  Negative: {round(patterns['day_of_week']['day_stats'].loc['Thursday', 'negative_pct'], 1)}%  Avg Gain: {round(patterns['day_of_week']['day_stats'].loc['Thursday', 'avg_gain'], 2)}%  Avg Loss: {round(patterns['day_of_week']['day_stats'].loc['Thursday', 'avg_loss'], 2)}%
-  Friday:    Avg Change: {round(patterns['day_of_week']['day_stats'].loc['Friday', 'avg_change'], 2)}%  Positive: {round(patterns['day_of_week']['day_stats'].loc['Friday', 'positive_pct'], 1)}%  Negative: {round(patterns['day_of_week']['day_stats'].loc['Friday', 'negative_pct'], 1)}%  Avg Gain: {round(patterns['day_of_week']['day_stats'].loc['Friday', 'avg_gain'], 2)}%  Avg Loss: {round(patterns['day_of_week']['day_stats'].loc['Friday', 'avg_loss'], 2)}%
+{day_of_week_lines}
   Consecutive Positive Weeks: {patterns['day_of_week']['consecutive_positive_weeks']}
   Consecutive Negative Weeks: {patterns['day_of_week']['consecutive_negative_weeks']}
 
@@ -334,10 +517,10 @@ Weekly Patterns:
   Weak Negative Weeks (>-2% change): {patterns['weekly']['weak_negative_weeks']}
 
 <b>Weekly Breakdown:</b> 
-================"""
+================"""]
         # Append weekly breakdown details
         for week_info in weekly_analysis:
-            output += f"""
+            output_parts.append(f"""
 
 Week: {week_info['start_date']} - {week_info['end_date']} ({week_info['total_days']} Trading Days)
 --------------------------------------
@@ -362,9 +545,9 @@ Week: {week_info['start_date']} - {week_info['end_date']} ({week_info['total_day
     {round(week_info['week_change'], 2)}%
   Daily Breakdown:
 {week_info['daily_breakdown']}
-"""
+""")
 
-        return output
+        return "".join(output_parts)
 
     except FileNotFoundError:
         return "Error: File not found."
@@ -438,6 +621,30 @@ def upload_file():
         </div>
         '''
 
+@functools.lru_cache(maxsize=32)
+def pattern_report(contents):
+    """
+    Run and format the advanced pattern analysis for a file, cached on its contents.
+    
+    Parameters:
+    contents (FileContents): The file as returned by read_file
+    
+    Returns:
+    str: Formatted pattern analysis, or None if required columns are missing
+    """
+    # Read the CSV file
+    df = load_csv(contents)
+    
+    # Ensure required columns exist
+    if 'Date' not in df.columns or 'Change %' not in df.columns:
+        return None
+    
+    # Run the pattern analysis
+    pattern_results = pattern_analyzer.analyze_patterns(df)
+    
+    # Format the results
+    return pattern_analyzer.format_pattern_results(pattern_results)
+
 @app.route('/patterns/<filename>')
 def pattern_analysis(filename):
     """Display advanced pattern analysis for the uploaded file."""
@@ -447,36 +654,10 @@ def pattern_analysis(filename):
         return "File not found. Please upload the file again."
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(file_path)
-        
-        # Ensure required columns exist
-        if 'Date' not in df.columns or 'Change %' not in df.columns:
+        formatted_results = pattern_report(read_file(file_path))
+        if formatted_results is None:
             return "Required columns (Date, Change %) not found in the CSV file."
         
-        # Convert dates to datetime and create day of week column
-        df['Date'] = pd.to_datetime(df['Date'])
-        
-        # Convert percentage strings to float numbers if needed
-        if df['Change %'].dtype == object:  # Check if it's a string type
-            df['Change %'] = df['Change %'].str.rstrip('%').astype('float')
-        
-        # Convert price columns to float if they exist
-        for col in ['Price', 'High', 'Low']:
-            if col in df.columns:
-                # Check if the column is string type before applying string methods
-                if df[col].dtype == object:  # String type
-                    df[col] = df[col].str.replace(',', '').astype('float')
-                elif not pd.api.types.is_float_dtype(df[col]):
-                    # If it's not already float, convert it
-                    df[col] = df[col].astype('float')
-        
-        # Run the pattern analysis
-        pattern_results = pattern_analyzer.analyze_patterns(df)
-        
-        # Format the results
-        formatted_results = pattern_analyzer.format_pattern_results(pattern_results)
-        
         return f'''
         <!doctype html>
         <html>
@@ -629,20 +810,12 @@ def avg_range_analysis(filename):
     
     try:
         # Read the CSV file
-        df = pd.read_csv(file_path)
+        df = load_csv(read_file(file_path))
         
         # Check if "Change %" column exists
         if 'Change %' not in df.columns:
             return "No 'Change %' column found in the CSV file."
         
-        # Convert dates to datetime
-        if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'])
-        
-        # Convert percentage strings to float numbers if they are strings
-        if df['Change %'].dtype == object:  # Check if it's a string type
-            df['Change %'] = df['Change %'].str.rstrip('%').astype('float')
-        
         # Run the average range analysis
         analysis_results = avg_range.analyze_avg_range(df)
         
@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+from numba_support import njit, NUMBA_AVAILABLE
+
+# CSS color classes for negative, zero and positive values
+COLOR_CLASSES = ('negative', 'neutral', 'positive')
 
 def analyze_avg_range(df):
     """
@@ -19,50 +23,58 @@ def analyze_avg_range(df):
     if 'Change %' not in df.columns:
         return {"error": "Required column 'Change %' not found in data"}
     
-    # Make a copy to avoid modifying the original dataframe
-    df = df.copy()
+    # Work on the column arrays so the caller's dataframe is neither copied nor modified
+    changes = df['Change %'].to_numpy(dtype=np.float64)
+    has_dates = 'Date' in df.columns
     
     # Ensure date is datetime and sort chronologically
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
-        df = df.sort_values('Date')
-    
-    # Create a column for the range blocks (0.30% blocks)
-    df['Range_Block'] = df['Change %'].apply(lambda x: calculate_range_block(x))
-    
-    # Group by range blocks
-    range_blocks = df.groupby('Range_Block')
+    if has_dates:
+        timestamps = pd.to_datetime(df['Date']).to_numpy()
+        chronological = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[chronological]
+        changes = changes[chronological]
+        dates = timestamps.astype('datetime64[D]')
+        
+        # Label every day with its ISO week once, instead of once per range block,
+        # as an integer key (e.g. 202405 for week 5 of 2024)
+        iso = pd.DatetimeIndex(timestamps).isocalendar()
+        week_ids = iso['year'].to_numpy(dtype=np.int32) * 100 + iso['week'].to_numpy(dtype=np.int32)
+    
+    # Calculate the range block of every day (0.30% blocks)
+    blocks = calculate_range_blocks(changes)
+    
+    # Stable-sort the days by range block (skipping missing changes) so every block
+    # becomes a contiguous run that still lists its days in date order
+    valid_rows = np.flatnonzero(~np.isnan(blocks))
+    order = valid_rows[np.argsort(blocks[valid_rows], kind='stable')]
+    block_values, block_starts, block_counts = np.unique(blocks[order], return_index=True, return_counts=True)
+    
+    # Calculate the average 'Change %' of every block from the run sums,
+    # rounded to 2 decimal places in one go
+    if len(order):
+        avg_changes = np.round(np.add.reduceat(changes[order], block_starts) / block_counts, 2)
+    else:
+        avg_changes = np.empty(0)
     
     # Initialize data structure for range block analysis
     range_block_analysis = {}
     
     # Analyze each range block
-    for block, block_data in range_blocks:
-        # Skip if block is None or NaN
-        if block is None or pd.isna(block):
-            continue
+    for block, start, count, avg_change in zip(block_values, block_starts, block_counts, avg_changes):
+        rows = order[start:start + count]
         
-        # Calculate average of the 'Change %' values in this block
-        avg_change = block_data['Change %'].mean()
-        
-        # Get dates for this block
-        dates = block_data['Date'].tolist() if 'Date' in block_data.columns else []
-        
-        # Get week information if available
+        # Get week information and streaks if dates are available
+        # (rows are in date order, so block dates are already sorted)
         weeks = []
-        if 'Date' in block_data.columns:
-            block_data['Week'] = block_data['Date'].dt.isocalendar().week
-            block_data['Year'] = block_data['Date'].dt.isocalendar().year
-            block_data['Week_ID'] = block_data['Year'].astype(str) + '-' + block_data['Week'].astype(str)
-            weeks = block_data['Week_ID'].unique().tolist()
-        
-        # Identify streaks
-        streaks = identify_streaks(block_data) if 'Date' in block_data.columns else []
+        streaks = []
+        if has_dates:
+            weeks = pd.unique(week_ids[rows]).tolist()
+            streaks = find_date_streaks(dates[rows], week_ids[rows])
         
         # Store analysis for this block
         range_block_analysis[block] = {
-            'count': len(block_data),
-            'avg_change': round(avg_change, 2),
+            'count': int(count),
+            'avg_change': avg_change,
             'weeks': weeks,
             'streaks': streaks
         }
@@ -86,81 +98,104 @@ def calculate_range_block(change_percent):
     if pd.isna(change_percent):
         return None
     
+    return float(calculate_range_blocks(np.array([change_percent], dtype=np.float64))[0])
+
+def calculate_range_blocks(change_percents):
+    """
+    Calculate the range block of every change percentage at once.
+    Range blocks are in increments of 0.30%.
+    
+    Parameters:
+    change_percents (numpy.ndarray): The change percentage values
+    
+    Returns:
+    numpy.ndarray: The range block values, NaN where the change is missing
+    """
     # Handle both positive and negative values
-    sign = 1 if change_percent >= 0 else -1
-    abs_change = abs(change_percent)
+    sign = np.where(change_percents >= 0, 1.0, -1.0)
+    abs_change = np.abs(change_percents)
     
     # Calculate the block number (how many 0.30% blocks)
-    block_number = int(abs_change / 0.30)
+    block_number = np.floor(abs_change / 0.30)
     
-    # If the change is exactly at a block boundary, use that block
-    if abs_change % 0.30 == 0:
-        block_value = block_number * 0.30
-    else:
-        # Otherwise, go to the next block
-        block_value = (block_number + 1) * 0.30
+    # A change exactly at a block boundary stays in that block,
+    # otherwise it goes to the next block
+    block_number = np.where(np.fmod(abs_change, 0.30) == 0, block_number, block_number + 1)
     
-    # Apply the sign to get the correct block
-    return round(sign * block_value, 2)
+    # Apply the sign to get the correct block (NaN changes stay NaN)
+    return np.round(sign * (block_number * 0.30), 2)
 
-def identify_streaks(block_data):
+def find_date_streaks(dates, week_ids):
     """
-    Identify consecutive day streaks in the data.
+    Identify consecutive day streaks in an array of dates.
     
     Parameters:
-    block_data (pandas.DataFrame): DataFrame containing data for a specific range block
+    dates (numpy.ndarray): Sorted datetime64[D] dates
+    week_ids (numpy.ndarray): ISO week key of every date (e.g. 202405 for week 5 of 2024)
     
     Returns:
     list: List of streaks with information about each streak
     """
-    if 'Date' not in block_data.columns or len(block_data) <= 1:
-        return []
+    # Convert to days since epoch for easy consecutive day detection
+    day_numbers = np.ascontiguousarray(dates.view('i8'))
     
-    # Sort by date
-    block_data = block_data.sort_values('Date')
+    if NUMBA_AVAILABLE:
+        starts, lengths = _streak_runs(day_numbers)
+    else:
+        # A new run starts wherever the next date is not exactly one day later;
+        # only runs of more than 1 day are streaks
+        run_starts = np.flatnonzero(np.r_[True, np.diff(day_numbers) != 1])
+        run_lengths = np.diff(np.r_[run_starts, len(day_numbers)])
+        is_streak = run_lengths > 1
+        starts = run_starts[is_streak]
+        lengths = run_lengths[is_streak]
+    if len(starts) == 0:
+        return []
+    ends = starts + lengths - 1
     
-    # Convert dates to days since epoch for easy consecutive day detection
-    block_data['Day_Number'] = (block_data['Date'] - pd.Timestamp('1970-01-01')).dt.days
+    # Format the boundary dates of every streak in one pass each
+    start_dates = np.datetime_as_string(dates[starts], unit='D').tolist()
+    end_dates = np.datetime_as_string(dates[ends], unit='D').tolist()
     
-    # Initialize variables for streak detection
     streaks = []
-    current_streak = []
-    prev_day = None
-    
-    for _, row in block_data.iterrows():
-        current_day = row['Day_Number']
-        
-        if prev_day is None or current_day == prev_day + 1:
-            # Continue the streak
-            current_streak.append(row)
-        else:
-            # End the previous streak if it exists and has more than 1 day
-            if len(current_streak) > 1:
-                streak_info = {
-                    'length': len(current_streak),
-                    'start_date': current_streak[0]['Date'].strftime('%Y-%m-%d'),
-                    'end_date': current_streak[-1]['Date'].strftime('%Y-%m-%d'),
-                    'week_ids': list(set([f"{d['Date'].year}-{d['Date'].week}" for d in current_streak]))
-                }
-                streaks.append(streak_info)
-            
-            # Start a new streak
-            current_streak = [row]
-        
-        prev_day = current_day
-    
-    # Don't forget to add the last streak if it exists and has more than 1 day
-    if len(current_streak) > 1:
-        streak_info = {
-            'length': len(current_streak),
-            'start_date': current_streak[0]['Date'].strftime('%Y-%m-%d'),
-            'end_date': current_streak[-1]['Date'].strftime('%Y-%m-%d'),
-            'week_ids': list(set([f"{d['Date'].year}-{d['Date'].week}" for d in current_streak]))
-        }
-        streaks.append(streak_info)
+    for start, end, length, start_date, end_date in zip(starts, ends, lengths, start_dates, end_dates):
+        streaks.append({
+            'length': int(length),
+            'start_date': start_date,
+            'end_date': end_date,
+            'week_ids': list(set(week_ids[start:end + 1].tolist()))
+        })
     
     return streaks
 
+@njit(cache=True)
+def _streak_runs(day_numbers):
+    """
+    Find the runs of consecutive days in a sorted array of day numbers.
+    
+    Parameters:
+    day_numbers (numpy.ndarray): Sorted int64 days since epoch
+    
+    Returns:
+    tuple: Start positions and lengths of every run longer than 1 day
+    """
+    n = len(day_numbers)
+    # Runs of 2+ days cannot overlap, so there are at most n // 2 of them
+    starts = np.empty(n // 2 + 1, np.int64)
+    lengths = np.empty(n // 2 + 1, np.int64)
+    count = 0
+    run_start = 0
+    
+    for i in range(1, n + 1):
+        if i == n or day_numbers[i] != day_numbers[i - 1] + 1:
+            if i - run_start > 1:
+                starts[count] = run_start
+                lengths[count] = i - run_start
+                count += 1
+            run_start = i
+    
+    return starts[:count], lengths[:count]
+
 def format_avg_range_results(results):
     """
     Format the average range analysis results into HTML format.
@@ -174,48 +209,41 @@ def format_avg_range_results(results):
     if 'error' in results:
         return f"<p class='error'>{results['error']}</p>"
     
-    # Start with a back button and heading
-    output = """
+    # Start with a back button and heading; pieces are joined once at the end
+    parts = ["""
     <div class="back-button">
         <a href="javascript:history.back()" class="btn">Back to Previous Analysis</a>
     </div>
     <h2>Average Range Block Analysis</h2>
     <p>Analysis of 'Change %' values grouped into 0.30% blocks</p>
-    """
+    """]
     
     # Create a table for the results
-    output += "<table class='avg-range-table'>\n"
+    parts.append("<table class='avg-range-table'>\n")
     
     # Table headers
-    output += "<thead>\n<tr>\n"
     headers = ["Range Block", "Avg. Range", "Count", "Streaks", "Weeks"]
-    for header in headers:
-        output += f"<th>{header}</th>\n"
-    output += "</tr>\n</thead>\n"
+    parts.append("<thead>\n<tr>\n" + "".join(f"<th>{header}</th>\n" for header in headers) + "</tr>\n</thead>\n")
     
     # Table body
-    output += "<tbody>\n"
+    parts.append("<tbody>\n")
     
     # Sort range blocks numerically
     if 'range_blocks' in results:
-        sorted_blocks = sorted(results['range_blocks'].keys(), 
-                              key=lambda x: (abs(x), -1 if x < 0 else 1))
+        # (by size, negative block first when sizes tie)
+        blocks = np.fromiter(results['range_blocks'].keys(), dtype=np.float64, count=len(results['range_blocks']))
+        order = np.lexsort((np.where(blocks < 0, -1, 1), np.abs(blocks)))
+        sorted_blocks = blocks[order].tolist()
         
         for block in sorted_blocks:
             block_data = results['range_blocks'][block]
-            output += "<tr>\n"
             
             # Range Block column
             sign = '+' if block >= 0 else ''
-            output += f"<td class='{get_color_class(block)}'>{sign}{block}%</td>\n"
             
             # Avg. Range column
             avg_change = block_data['avg_change']
             sign_avg = '+' if avg_change >= 0 else ''
-            output += f"<td class='{get_color_class(avg_change)}'>{sign_avg}{avg_change}%</td>\n"
-            
-            # Count column
-            output += f"<td>{block_data['count']}</td>\n"
             
             # Streaks column
             if block_data['streaks']:
@@ -224,16 +252,15 @@ def format_avg_range_results(results):
                     f"{s['length']} days ({format_short_date(s['start_date'])} to {format_short_date(s['end_date'])})" 
                     for s in block_data['streaks']
                 ])
-                output += f"<td>{streak_text}</td>\n"
             else:
-                output += "<td>No streaks</td>\n"
+                streak_text = "No streaks"
             
             # Weeks column
             if block_data['weeks']:
                 # Group weeks by year
                 weeks_by_year = {}
                 for week_id in block_data['weeks']:
-                    year, week_num = week_id.split('-')
+                    year, week_num = divmod(int(week_id), 100)
                     if year not in weeks_by_year:
                         weeks_by_year[year] = []
                     weeks_by_year[year].append(week_num)
@@ -242,21 +269,29 @@ def format_avg_range_results(results):
                 weeks_parts = []
                 for year, week_nums in sorted(weeks_by_year.items()):
                     # Sort week numbers numerically
-                    sorted_weeks = sorted(map(int, week_nums))
+                    sorted_weeks = sorted(week_nums)
                     weeks_parts.append(f"{year}: {', '.join(map(str, sorted_weeks))}")
                 
                 # Join with line breaks for HTML display
                 weeks_text = "<br>".join(weeks_parts)
-                output += f"<td>{weeks_text}</td>\n"
             else:
-                output += "<td>-</td>\n"
+                weeks_text = "-"
             
-            output += "</tr>\n"
-    
-    output += "</tbody>\n</table>\n"
+            # Emit the whole row at once
+            parts.append(
+                "<tr>\n"
+                f"<td class='{get_color_class(block)}'>{sign}{block}%</td>\n"
+                f"<td class='{get_color_class(avg_change)}'>{sign_avg}{avg_change}%</td>\n"
+                f"<td>{block_data['count']}</td>\n"
+                f"<td>{streak_text}</td>\n"
+                f"<td>{weeks_text}</td>\n"
+                "</tr>\n"
+            )
+    
+    parts.append("</tbody>\n</table>\n")
     
     # Add CSS for the table
-    output += """
+    parts.append("""
     <style>
         .back-button {
             margin-bottom: 20px;
@@ -309,9 +344,9 @@ def format_avg_range_results(results):
             font-weight: bold;
         }
     </style>
-    """
+    """)
     
-    return output
+    return "".join(parts)
 
 def format_short_date(date_str):
     """
@@ -345,9 +380,5 @@ def get_color_class(value):
     Returns:
     str: CSS class name ('positive', 'negative', or 'neutral')
     """
-    if value > 0:
-        return 'positive'
-    elif value < 0:
-        return 'negative'
-    else:
-        return 'neutral'
+    # Index by the sign (-1, 0 or 1); NaN compares False both ways and is neutral
+    return COLOR_CLASSES[int(value > 0) - int(value < 0) + 1]
@@ -14,8 +14,6 @@ def analyze_index_base_pattern(primary_df, index_base_df):
     """
     # Initialize results dictionary
     results = {}
-    # Add a new field to store price percentages
-    results['price_percentages'] = []
     
     # Ensure required columns exist in both dataframes
     required_columns = ['Open', 'Low', 'High', 'Price']
@@ -29,83 +27,71 @@ def analyze_index_base_pattern(primary_df, index_base_df):
     if missing_columns:
         return {"error": f"Required columns {', '.join(missing_columns)} not found in index base data"}
     
-    # Extract values from index_base_df
-    results['open'] = index_base_df['Open'].values.tolist()
-    results['low'] = index_base_df['Low'].values.tolist()
-    results['high'] = index_base_df['High'].values.tolist()
-    results['price'] = index_base_df['Price'].values.tolist()
+    # Extract values from index_base_df; per-row results are kept as column arrays,
+    # with NaN marking values that are not available
+    results['open'] = index_base_df['Open'].to_numpy()
+    results['low'] = index_base_df['Low'].to_numpy()
+    results['high'] = index_base_df['High'].to_numpy()
+    results['price'] = index_base_df['Price'].to_numpy()
     
     # Get the primary open values for each date
-    results['primary_open'] = []
-    
     # Check if dates are available in both dataframes
     if 'Date' in primary_df.columns and 'Date' in index_base_df.columns:
-        # For each date in index_base_df, find the corresponding primary open value
-        for date in index_base_df['Date']:
-            # Find matching date in primary_df
-            matching_row = primary_df[primary_df['Date'] == date]
-            if not matching_row.empty:
-                results['primary_open'].append(matching_row['Open'].values[0])
-            else:
-                # If no matching date found, use None
-                results['primary_open'].append(None)
+        # Match every index base date to the primary row on that date, or failing that
+        # the primary row up to one day earlier, with a single sorted as-of merge
+        # (the first primary row of a date wins)
+        primary_opens = pd.DataFrame({
+            'Date': pd.to_datetime(primary_df['Date'], errors='coerce'),
+            'Open': primary_df['Open'].to_numpy(dtype=np.float64),
+        }).dropna(subset=['Date']).drop_duplicates('Date').sort_values('Date')
+        index_dates = pd.DataFrame({
+            'Date': pd.to_datetime(index_base_df['Date'], errors='coerce'),
+            'Row': np.arange(len(index_base_df)),
+        }).dropna(subset=['Date']).sort_values('Date', kind='mergesort')
+        matched = pd.merge_asof(index_dates, primary_opens, on='Date',
+                                direction='backward', tolerance=pd.Timedelta('1D'))
+        
+        # Put the matches back in index base order; if no matching date found, the primary open is NaN
+        results['primary_open'] = np.full(len(index_base_df), np.nan)
+        results['primary_open'][matched['Row'].to_numpy()] = matched['Open'].to_numpy()
     else:
         # If dates are not available, use the first open value for all
-        results['primary_open'] = [primary_df['Open'].values[0]] * len(index_base_df)
+        results['primary_open'] = np.full(len(index_base_df), primary_df['Open'].values[0], dtype=np.float64)
     
-    # Calculate since low and since high values
-    results['since_low'] = []
-    results['since_high'] = []
-    results['alt_opens'] = []
+    # Calculate since low, since high and alt. opens values for every row at once
+    low = index_base_df['Low'].to_numpy(dtype=np.float64)
+    high = index_base_df['High'].to_numpy(dtype=np.float64)
+    price = index_base_df['Price'].to_numpy(dtype=np.float64)
+    index_open = index_base_df['Open'].to_numpy(dtype=np.float64)
+    primary_open = results['primary_open']
     
-    for i, row in index_base_df.iterrows():
-        # Calculate percentage change from low to price
-        if row['Low'] != 0:  # Avoid division by zero
-            since_low = ((row['Price'] - row['Low']) / row['Low']) * 100
-            results['since_low'].append(round(since_low, 2))
-        else:
-            results['since_low'].append(0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate percentage change from low, from high and from open to price
+        since_low = ((price - low) / low) * 100
+        since_high = ((price - high) / high) * 100
+        price_percentages = ((price - index_open) / index_open) * 100
         
-        # Calculate percentage change from high to price
-        if row['High'] != 0:  # Avoid division by zero
-            since_high = ((row['Price'] - row['High']) / row['High']) * 100
-            results['since_high'].append(round(since_high, 2))
-        else:
-            results['since_high'].append(0)
-            
-        # Calculate percentage difference between primary open and index base open
-        primary_open = results['primary_open'][i] if i < len(results['primary_open']) and results['primary_open'][i] is not None else None
-        if primary_open is not None and row['Open'] != 0:  # Avoid division by zero
-            # Extract integer parts (only count absolute value until the dot)
-            primary_open_int = int(primary_open)  # Remove abs() to keep sign
-            index_open_int = int(row['Open'])  # Remove abs() to keep sign
-            
-            # Calculate the difference as a percentage of the index base value
-            # Following the specific percentage calculation pattern from the example
-            if index_open_int > 0:
-                # If primary_open is 41363 and index_open is 41097, result should be -0.39%
-                # This means we need to calculate: (index_open - primary_open) / index_open * 100
-                diff_percentage = (index_open_int - primary_open_int) / index_open_int * 100
-                # Round to 2 decimal places
-                results['alt_opens'].append(round(diff_percentage, 2))
-            else:
-                results['alt_opens'].append(None)
-        else:
-            results['alt_opens'].append(None)
+        # Calculate percentage difference between primary open and index base open,
+        # using the integer parts only (truncated, keeping the sign).
+        # If primary_open is 41363 and index_open is 41097, result should be -0.39%
+        # This means we need to calculate: (index_open - primary_open) / index_open * 100
+        primary_open_int = np.trunc(primary_open)
+        index_open_int = np.trunc(index_open)
+        alt_opens = (index_open_int - primary_open_int) / index_open_int * 100
+    has_alt_open = ~np.isnan(primary_open) & (index_open != 0) & (index_open_int > 0)
+    
+    # Round to 2 decimal places; rows that would divide by zero report 0 (since
+    # low/high) or NaN (price percentages, and alt. opens, also used when there
+    # is no primary open)
+    results['since_low'] = np.where(low != 0, np.round(since_low, 2), 0.0)
+    results['since_high'] = np.where(high != 0, np.round(since_high, 2), 0.0)
+    results['alt_opens'] = np.where(has_alt_open, np.round(alt_opens, 2), np.nan)
+    results['price_percentages'] = np.where(index_open != 0, np.round(price_percentages, 2), np.nan)
     
     # Add dates if available
     if 'Date' in index_base_df.columns:
         results['dates'] = index_base_df['Date'].values.tolist()
     
-    # Calculate price percentages relative to open values
-    for i in range(len(results['price'])):
-        if i < len(results['open']) and results['open'][i] != 0:
-            # Calculate percentage change from open to price
-            price_percentage = ((results['price'][i] - results['open'][i]) / results['open'][i]) * 100
-            results['price_percentages'].append(round(price_percentage, 2))
-        else:
-            results['price_percentages'].append(None)
-    
     return results
 
 def format_index_base_results(results):
@@ -121,107 +107,92 @@ def format_index_base_results(results):
     if 'error' in results:
         return f"<p class='error'>{results['error']}</p>"
     
-    # Start with a back button and heading
-    output = """
+    # Start with a back button and heading; pieces are joined once at the end
+    parts = ["""
     <div class="back-button">
         <a href="javascript:history.back()" class="btn">Back to Previous Analysis</a>
     </div>
     <h2>Index Base Pattern Analysis</h2>
-    """
+    """]
     
     # Create a table for the results
-    output += "<table class='index-base-table'>\n"
+    parts.append("<table class='index-base-table'>\n")
     
     # Table headers
-    output += "<thead>\n<tr>\n"
     headers = ["Date", "Primary Open", "Open", "Low", "High", "Since Low (%)", "Since High (%)", "% alt. opens", "Price"]
-    for header in headers:
-        output += f"<th>{header}</th>\n"
-    output += "</tr>\n</thead>\n"
+    parts.append("<thead>\n<tr>\n" + "".join(f"<th>{header}</th>\n" for header in headers) + "</tr>\n</thead>\n")
     
     # Table body
-    output += "<tbody>\n"
+    parts.append("<tbody>\n")
     
     # Determine number of rows
     num_rows = len(results.get('open', []))
     
+    # Work out the color class of every percentage column up front
+    since_low_classes = percentage_color_classes(results['since_low'])
+    since_high_classes = percentage_color_classes(results['since_high'])
+    alt_opens_classes = percentage_color_classes(results['alt_opens'])
+    price_percentage_classes = percentage_color_classes(results.get('price_percentages', []))
+    
     for i in range(num_rows):
-        output += "<tr>\n"
-        
         # Date column
         if 'dates' in results and i < len(results['dates']):
-            output += f"<td>{results['dates'][i]}</td>\n"
+            date_cell = f"<td>{results['dates'][i]}</td>\n"
         else:
-            output += f"<td>Row {i+1}</td>\n"
+            date_cell = f"<td>Row {i+1}</td>\n"
         
         # Primary Open column
-        if 'primary_open' in results and i < len(results['primary_open']) and results['primary_open'][i] is not None:
-            output += f"<td>{results['primary_open'][i]}</td>\n"
-        else:
-            output += "<td>-</td>\n"
-        
-        # Open column
-        if i < len(results['open']):
-            output += f"<td>{results['open'][i]}</td>\n"
+        if 'primary_open' in results and i < len(results['primary_open']) and not np.isnan(results['primary_open'][i]):
+            primary_open_cell = f"<td>{results['primary_open'][i]}</td>\n"
         else:
-            output += "<td>-</td>\n"
+            primary_open_cell = "<td>-</td>\n"
         
-        # Low column
-        if i < len(results['low']):
-            output += f"<td>{results['low'][i]}</td>\n"
-        else:
-            output += "<td>-</td>\n"
-        
-        # High column
-        if i < len(results['high']):
-            output += f"<td>{results['high'][i]}</td>\n"
-        else:
-            output += "<td>-</td>\n"
+        # Open, Low and High columns
+        open_cell = f"<td>{results['open'][i]}</td>\n" if i < len(results['open']) else "<td>-</td>\n"
+        low_cell = f"<td>{results['low'][i]}</td>\n" if i < len(results['low']) else "<td>-</td>\n"
+        high_cell = f"<td>{results['high'][i]}</td>\n" if i < len(results['high']) else "<td>-</td>\n"
         
         # Since Low column
         if i < len(results['since_low']):
-            change = results['since_low'][i]
-            color_class = "positive" if change >= 0 else "negative"
-            output += f"<td class='{color_class}'>{change}%</td>\n"
+            since_low_cell = f"<td class='{since_low_classes[i]}'>{results['since_low'][i]}%</td>\n"
         else:
-            output += "<td>-</td>\n"
+            since_low_cell = "<td>-</td>\n"
         
         # Since High column
         if i < len(results['since_high']):
-            change = results['since_high'][i]
-            color_class = "positive" if change >= 0 else "negative"
-            output += f"<td class='{color_class}'>{change}%</td>\n"
+            since_high_cell = f"<td class='{since_high_classes[i]}'>{results['since_high'][i]}%</td>\n"
         else:
-            output += "<td>-</td>\n"
+            since_high_cell = "<td>-</td>\n"
         
         # % alt. opens column
-        if i < len(results['alt_opens']) and results['alt_opens'][i] is not None:
-            change = results['alt_opens'][i]
-            color_class = "positive" if change >= 0 else "negative"
-            output += f"<td class='{color_class}'>{change}%</td>\n"
+        if i < len(results['alt_opens']) and not np.isnan(results['alt_opens'][i]):
+            alt_opens_cell = f"<td class='{alt_opens_classes[i]}'>{results['alt_opens'][i]}%</td>\n"
         else:
-            output += "<td>-</td>\n"
+            alt_opens_cell = "<td>-</td>\n"
         
         # Price column with percentage
         if i < len(results['price']):
             price_value = results['price'][i]
             
             # Add percentage if available
-            if 'price_percentages' in results and i < len(results['price_percentages']) and results['price_percentages'][i] is not None:
+            if 'price_percentages' in results and i < len(results['price_percentages']) and not np.isnan(results['price_percentages'][i]):
                 percentage = results['price_percentages'][i]
-                color_class = "positive" if percentage >= 0 else "negative"
-                output += f"<td>{price_value} <span class='{color_class}'>({percentage}%)</span></td>\n"
+                price_cell = f"<td>{price_value} <span class='{price_percentage_classes[i]}'>({percentage}%)</span></td>\n"
             else:
-                output += f"<td>{price_value}</td>\n"
+                price_cell = f"<td>{price_value}</td>\n"
         else:
-            output += "<td>-</td>\n"
+            price_cell = "<td>-</td>\n"
         
-        output += "</tr>\n"
+        # Emit the whole row at once
+        parts.append(
+            "<tr>\n" + date_cell + primary_open_cell + open_cell + low_cell + high_cell
+            + since_low_cell + since_high_cell + alt_opens_cell + price_cell + "</tr>\n"
+        )
     
-    output += "</tbody>\n</table>\n"
+    parts.append("</tbody>\n</table>\n")
     
     # Add CSS for the table
-    output += """
+    parts.append("""
     <style>
         .back-button {
             margin-bottom: 20px;
@@ -271,6 +242,18 @@ def format_index_base_results(results):
             font-weight: bold;
         }
     </style>
+    """)
+    
+    return "".join(parts)
+
+def percentage_color_classes(values):
     """
+    Get the CSS color class of every value in a percentage column.
+    
+    Parameters:
+    values (numpy.ndarray): Percentage values, NaN where missing
     
-    return output
\ No newline at end of file
+    Returns:
+    numpy.ndarray: 'positive' for values >= 0, 'negative' otherwise
+    """
+    return np.where(np.array(values, dtype=np.float64) >= 0, 'positive', 'negative')
@@ -0,0 +1,19 @@
+"""
+Optional Numba support for the analysis modules.
+
+When numba is installed, njit is numba's decorator and the compiled kernels
+are used. Otherwise njit leaves the function untouched and callers should
+check NUMBA_AVAILABLE to fall back to their NumPy implementations.
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the decorated function unchanged."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
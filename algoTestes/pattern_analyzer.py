@@ -1,6 +1,16 @@
 import pandas as pd
 import numpy as np
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from numba_support import njit, NUMBA_AVAILABLE
+
+# Worker threads for the independent analyses; pandas/NumPy release the GIL
+analysis_executor = ThreadPoolExecutor(max_workers=3)
+
+# Month names, indexed by month number - 1; results are keyed by month number
+MONTH_NAMES = (
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
 
 def analyze_patterns(df):
     """
@@ -17,47 +27,94 @@ def analyze_patterns(df):
     if 'Date' not in df.columns or 'Change %' not in df.columns:
         return {"error": "Required columns not found in data"}
     
-    # Make a copy to avoid modifying the original dataframe
-    df = df.copy()
-    
-    # Ensure date is datetime and sort chronologically
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
+    # Ensure date is datetime and sort chronologically (stable, missing dates last)
+    dates = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[ns]')
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    change = df['Change %'].to_numpy(dtype=np.float64)[order]
+    
+    # Build the working frame in one go from the columns the analyses read, so the
+    # original is neither modified nor copied and no column is inserted later:
+    # every day is classified once and the month keys are shared. The RangeIndex
+    # makes row position i + 1 the next trading day, and the analyses below only
+    # read df, so they can run side by side
+    df = pd.DataFrame({
+        'Date': dates,
+        'Change %': change,
+        **sign_columns(change),
+        **month_columns(dates),
+    })
     
     # Initialize results dictionary
     results = {}
     
-    # Calculate weekly changes
-    df['Week_Number'] = df['Date'].dt.isocalendar().week
-    df['Year'] = df['Date'].dt.isocalendar().year
-    weekly_changes = df.groupby(['Year', 'Week_Number'])['Change %'].sum().reset_index()
-    weekly_changes = weekly_changes.sort_values(['Year', 'Week_Number'])
+    # Calculate weekly changes; rows are in date order, so every Monday-Sunday (ISO)
+    # week is a contiguous run of rows summed in one segmented reduction
+    has_date = ~np.isnat(dates)
+    week_ids = (dates[has_date].astype('datetime64[D]').view(np.int64) + 3) // 7  # 1970-01-01 was a Thursday
+    week_starts = np.flatnonzero(np.r_[True, week_ids[1:] != week_ids[:-1]]) if len(week_ids) else week_ids
+    weekly_changes = sum_runs(change[has_date], week_starts)
     
     # 1. Consecutive Weeks Analysis
-    consecutive_weeks_analysis = analyze_consecutive_weeks(weekly_changes)
-    results['consecutive_weeks'] = consecutive_weeks_analysis
+    consecutive_weeks_future = analysis_executor.submit(analyze_consecutive_weeks, weekly_changes)
     
     # Day of Week Analysis has been removed
     
     # 3. Monthly Analysis
-    df['Month'] = df['Date'].dt.month
-    monthly_analysis = analyze_monthly_patterns(df)
-    results['monthly'] = monthly_analysis
+    monthly_future = analysis_executor.submit(analyze_monthly_patterns, df)
     
     # 4. Volatility Clustering Analysis
-    volatility_analysis = analyze_volatility_clustering(df)
-    results['volatility'] = volatility_analysis
+    volatility_future = analysis_executor.submit(analyze_volatility_clustering, df)
     
     # Price Level Analysis has been removed
     
+    results['consecutive_weeks'] = consecutive_weeks_future.result()
+    results['monthly'] = monthly_future.result()
+    results['volatility'] = volatility_future.result()
+    
     return results
 
+def sum_runs(values, run_starts):
+    """
+    Sum every contiguous run of values, skipping NaN.
+    
+    The runs are summed side by side, one position per step, with the same
+    compensated (Kahan) summation as pandas' groupby sum, so weeks whose daily
+    changes cancel out still total exactly 0 and keep breaking streaks.
+    
+    Parameters:
+    values (numpy.ndarray): Values in run order
+    run_starts (numpy.ndarray): Position of the first value of every run
+    
+    Returns:
+    numpy.ndarray: Sum of every run
+    """
+    run_lengths = np.diff(np.r_[run_starts, len(values)])
+    sums = np.zeros(len(run_starts))
+    compensation = np.zeros(len(run_starts))
+    
+    for offset in range(run_lengths.max() if len(run_lengths) else 0):
+        runs = np.flatnonzero(run_lengths > offset)
+        run_values = values[run_starts[runs] + offset]
+        runs = runs[~np.isnan(run_values)]
+        run_values = run_values[~np.isnan(run_values)]
+        
+        # An infinite value makes the compensation NaN; reset it so the sum stays infinite
+        with np.errstate(invalid='ignore'):
+            y = run_values - compensation[runs]
+            t = sums[runs] + y
+            run_compensation = t - sums[runs] - y
+        compensation[runs] = np.where(np.isnan(run_compensation), 0.0, run_compensation)
+        sums[runs] = t
+    
+    return sums
+
 def analyze_consecutive_weeks(weekly_changes):
     """
     Analyze patterns following consecutive positive or negative weeks.
     
     Parameters:
-    weekly_changes (pandas.DataFrame): DataFrame with weekly change data
+    weekly_changes (numpy.ndarray): Total change of every week in chronological order
     
     Returns:
     dict: Statistics about what happens after consecutive weeks
@@ -65,157 +122,193 @@ def analyze_consecutive_weeks(weekly_changes):
     results = {}
     
     # Get the list of weekly changes
-    changes = weekly_changes['Change %'].values
-    
-    # Initialize data structures for tracking streaks and outcomes
-    streaks = []
-    current_streak = {'type': None, 'length': 0, 'start_idx': 0}
-    
-    # First pass: identify all streaks
-    for i in range(len(changes)):
-        current_change = changes[i]
+    changes = np.asarray(weekly_changes, dtype=np.float64)
+    
+    # A streak needs a following week, so there is nothing to analyze without two weeks
+    if len(changes) < 2:
+        return results
+    
+    # Tally every (streak type, length) bucket, keyed as type_offset + length
+    # with positive streaks in the upper half
+    if NUMBA_AVAILABLE:
+        counts, next_positive, next_negative, next_sums = _streak_outcomes(
+            np.ascontiguousarray(changes, dtype=np.float64))
+    else:
+        # Classify every week once; NaN and neutral weeks break streaks
+        signs = np.where(changes > 0, 1, np.where(changes < 0, -1, 0)).astype(np.int8)
         
-        # Determine streak type and length
-        if current_change > 0:
-            if current_streak['type'] == 'positive':
-                current_streak['length'] += 1
-            else:
-                # End previous streak if it exists
-                if current_streak['type'] is not None and current_streak['length'] > 0:
-                    streaks.append(current_streak)
-                # Start new positive streak
-                current_streak = {'type': 'positive', 'length': 1, 'start_idx': i}
-        elif current_change < 0:
-            if current_streak['type'] == 'negative':
-                current_streak['length'] += 1
-            else:
-                # End previous streak if it exists
-                if current_streak['type'] is not None and current_streak['length'] > 0:
-                    streaks.append(current_streak)
-                # Start new negative streak
-                current_streak = {'type': 'negative', 'length': 1, 'start_idx': i}
-        else:  # current_change == 0
-            # End previous streak if it exists
-            if current_streak['type'] is not None and current_streak['length'] > 0:
-                streaks.append(current_streak)
-            # Reset streak (neutral weeks break streaks)
-            current_streak = {'type': None, 'length': 0, 'start_idx': i+1}
-    
-    # Add the last streak if it exists
-    if current_streak['type'] is not None and current_streak['length'] > 0:
-        streaks.append(current_streak)
-    
-    # Initialize counters for different streak lengths
-    streak_stats = {
-        'positive': defaultdict(lambda: {'count': 0, 'next_positive': 0, 'next_negative': 0, 'next_avg_change': []}),
-        'negative': defaultdict(lambda: {'count': 0, 'next_positive': 0, 'next_negative': 0, 'next_avg_change': []})
-    }
-    
-    # Second pass: analyze what happens after each streak
-    for streak in streaks:
-        streak_type = streak['type']
-        streak_length = streak['length']
-        end_idx = streak['start_idx'] + streak_length - 1
+        # Identify all streaks: maximal runs of positive or negative weeks
+        is_run_start = np.ones(len(signs), dtype=bool)
+        is_run_start[1:] = signs[1:] != signs[:-1]
+        run_starts = np.flatnonzero(is_run_start)
+        run_lengths = np.diff(np.r_[run_starts, len(signs)])
+        run_signs = signs[run_starts]
+        run_ends = run_starts + run_lengths - 1
         
-        # Check if there's a next week after this streak
-        if end_idx + 1 < len(changes):
-            next_change = changes[end_idx + 1]
-            
-            # Only count the maximum streak length for each streak
-            # This ensures we don't double-count shorter streaks within longer ones
-            length = min(streak_length, 10)  # Cap at 10 for analysis
-            streak_stats[streak_type][length]['count'] += 1
-            
-            if next_change > 0:
-                streak_stats[streak_type][length]['next_positive'] += 1
-            elif next_change < 0:
-                streak_stats[streak_type][length]['next_negative'] += 1
-            
-            streak_stats[streak_type][length]['next_avg_change'].append(next_change)
-    
-    # Calculate probabilities and average changes
-    for streak_type in ['positive', 'negative']:
+        # Analyze what happens after each streak that has a next week
+        followed = (run_signs != 0) & (run_ends + 1 < len(changes))
+        next_changes = changes[run_ends[followed] + 1]
+        
+        # Only count the maximum streak length for each streak
+        # This ensures we don't double-count shorter streaks within longer ones
+        lengths = np.minimum(run_lengths[followed], 10)  # Cap at 10 for analysis
+        
+        # One pass per statistic
+        keys = np.where(run_signs[followed] > 0, 11, 0) + lengths
+        counts = np.bincount(keys, minlength=22)
+        next_positive = np.bincount(keys, weights=next_changes > 0, minlength=22)
+        next_negative = np.bincount(keys, weights=next_changes < 0, minlength=22)
+        next_sums = np.bincount(keys, weights=next_changes, minlength=22)
+    
+    if not counts.any():
+        return results
+    
+    # Calculate probabilities and average changes of every bucket at once
+    # (empty buckets divide by zero and are skipped below)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prob_positive = np.round(next_positive / counts * 100, 2).tolist()
+        prob_negative = np.round(next_negative / counts * 100, 2).tolist()
+        avg_next_change = np.round(next_sums / counts, 2).tolist()
+    counts = counts.tolist()
+    
+    for streak_type, offset in [('positive', 11), ('negative', 0)]:
         for streak_length in range(1, 11):  # Analyze streaks of length 1 to 10
-            stats = streak_stats[streak_type][streak_length]
+            key = offset + streak_length
             
-            if stats['count'] > 0:
-                # Calculate probabilities
-                prob_positive = (stats['next_positive'] / stats['count']) * 100
-                prob_negative = (stats['next_negative'] / stats['count']) * 100
-                
-                # Calculate average next change
-                avg_next_change = sum(stats['next_avg_change']) / len(stats['next_avg_change']) if stats['next_avg_change'] else 0
-                
+            if counts[key] > 0:
                 results[f"{streak_length}_{streak_type}"] = {
-                    'count': stats['count'],
-                    'prob_next_positive': round(prob_positive, 2),
-                    'prob_next_negative': round(prob_negative, 2),
-                    'avg_next_change': round(avg_next_change, 2)
+                    'count': counts[key],
+                    'prob_next_positive': prob_positive[key],
+                    'prob_next_negative': prob_negative[key],
+                    'avg_next_change': avg_next_change[key]
                 }
     
     return results
 
 
 
+# Compiled for its one input type when the module is imported, so the first
+# analysis does not wait for the JIT
+@njit('Tuple((int64[::1], int64[::1], int64[::1], float64[::1]))(float64[::1])', cache=True)
+def _streak_outcomes(changes):
+    """
+    Tally what follows every streak of positive or negative weeks in a single pass.
+    
+    Parameters:
+    changes (numpy.ndarray): Weekly changes in chronological order
+    
+    Returns:
+    tuple: Per-bucket streak counts, next-positive counts, next-negative counts and
+           sums of next changes; bucket 11 + length is positive, 0 + length negative
+    """
+    counts = np.zeros(22, np.int64)
+    next_positive = np.zeros(22, np.int64)
+    next_negative = np.zeros(22, np.int64)
+    next_sums = np.zeros(22, np.float64)
+    n = len(changes)
+    sign = 0
+    length = 0
+    
+    # The state update is plain integer arithmetic rather than branches:
+    # the sign is -1, 0 or 1 (NaN and neutral weeks are 0 and break streaks)
+    current = int(changes[0] > 0) - int(changes[0] < 0) if n > 0 else 0
+    for i in range(n):
+        same = int(current == sign) * int(current != 0)
+        length = same * length + int(current != 0)
+        sign = current
+        
+        if i + 1 < n:
+            next_change = changes[i + 1]
+            current = int(next_change > 0) - int(next_change < 0)
+            
+            # A streak ends here when the next week has a different sign
+            if sign != 0 and current != sign:
+                # Cap at 10 for analysis
+                key = 11 * int(sign > 0) + min(length, 10)
+                counts[key] += 1
+                next_positive[key] += int(current > 0)
+                next_negative[key] += int(current < 0)
+                next_sums[key] += next_change
+    
+    return counts, next_positive, next_negative, next_sums
+
 def analyze_monthly_patterns(df):
     """
     Analyze patterns for each month of the year.
     
     Parameters:
-    df (pandas.DataFrame): DataFrame with daily data
+    df (pandas.DataFrame): DataFrame with daily data in chronological order
     
     Returns:
-    dict: Statistics about each month
+    dict: Statistics about each month, keyed by month number (1 = January)
     """
     results = {}
     
-    # Ensure we have the month
-    if 'Month' not in df.columns:
-        df['Month'] = df['Date'].dt.month
+    # Ensure we have the month (on a new frame, df is left as it is)
+    if 'Month' not in df.columns or 'Year_Month' not in df.columns:
+        df = df.assign(**month_columns(df['Date'].to_numpy(dtype='datetime64[ns]')))
     
-    # Add month name for readability
-    month_names = {
-        1: 'January', 2: 'February', 3: 'March', 4: 'April',
-        5: 'May', 6: 'June', 7: 'July', 8: 'August',
-        9: 'September', 10: 'October', 11: 'November', 12: 'December'
-    }
-    df['Month_Name'] = df['Month'].map(month_names)
+    # Flag positive/negative days so every statistic is a builtin reducer
+    if 'Is_Positive' not in df.columns or 'Is_Negative' not in df.columns:
+        df = df.assign(**sign_columns(df['Change %'].to_numpy(dtype=np.float64)))
     
     # Calculate monthly statistics
-    monthly_stats = df.groupby('Month_Name')['Change %'].agg([
-        ('mean', 'mean'),
-        ('median', 'median'),
-        ('positive', lambda x: (x > 0).mean() * 100),
-        ('negative', lambda x: (x < 0).mean() * 100),
-        ('count', 'count')
-    ])
-    
-    # Calculate monthly returns (sum of daily changes within each month)
-    df['Year_Month'] = df['Date'].dt.strftime('%Y-%m')
-    monthly_returns = df.groupby(['Year_Month', 'Month_Name'])['Change %'].sum().reset_index()
-    
-    # Calculate statistics for each month across years
+    monthly_stats = df.groupby('Month').agg(
+        mean=('Change %', 'mean'),
+        median=('Change %', 'median'),
+        positive=('Is_Positive', 'mean'),
+        negative=('Is_Negative', 'mean'),
+        count=('Change %', 'count'),
+    )
+    monthly_stats[['positive', 'negative']] *= 100
+    
+    # Calculate monthly returns (sum of daily changes within each month); rows are
+    # in date order, so every month is a contiguous run of the year-month key
+    year_months = df['Year_Month'].to_numpy()
+    has_month = ~np.isnan(year_months)
+    year_months = year_months[has_month]
+    month_starts = np.flatnonzero(np.r_[True, year_months[1:] != year_months[:-1]]) if len(year_months) else np.empty(0, np.intp)
+    returns = sum_runs(df['Change %'].to_numpy(dtype=np.float64)[has_month], month_starts)
+    
+    # Calculate statistics for each month across years, binned by month (0 = January)
+    month_codes = (year_months[month_starts] % 12).astype(np.intp)
+    month_counts = np.bincount(month_codes, minlength=12)
+    return_sums = np.bincount(month_codes, weights=returns, minlength=12)
+    positive_months = np.bincount(month_codes, weights=returns > 0, minlength=12)
+    negative_months = np.bincount(month_codes, weights=returns < 0, minlength=12)
+    
+    # Round every statistic in one pass (months without returns divide by zero
+    # and are skipped below)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_monthly_returns = np.round(return_sums / month_counts, 2).tolist()
+        positive_month_pcts = np.round(positive_months / month_counts * 100, 2).tolist()
+        negative_month_pcts = np.round(negative_months / month_counts * 100, 2).tolist()
+    month_counts = month_counts.tolist()
+    
     month_performance = {}
-    for month in month_names.values():
-        month_data = monthly_returns[monthly_returns['Month_Name'] == month]['Change %']
-        if not month_data.empty:
-            month_performance[month] = {
-                'avg_monthly_return': round(month_data.mean(), 2),
-                'positive_months': round((month_data > 0).mean() * 100, 2),
-                'negative_months': round((month_data < 0).mean() * 100, 2),
-                'count': len(month_data)
+    for code in range(12):
+        if month_counts[code]:
+            month_performance[code + 1] = {
+                'avg_monthly_return': avg_monthly_returns[code],
+                'positive_months': positive_month_pcts[code],
+                'negative_months': negative_month_pcts[code],
+                'count': month_counts[code]
             }
     
-    # Format monthly stats for return
+    # Format monthly stats for return, rounded as a whole
+    rounded_stats = monthly_stats.round(2)
+    rounded_stats['count'] = monthly_stats['count'].astype(int)
+    daily_stats = rounded_stats.to_dict('index')
     monthly_results = {}
-    for month in month_names.values():
-        if month in monthly_stats.index:
-            monthly_results[month] = {
-                'mean_daily_change': round(monthly_stats.loc[month, 'mean'], 2),
-                'median_daily_change': round(monthly_stats.loc[month, 'median'], 2),
-                'positive_days_pct': round(monthly_stats.loc[month, 'positive'], 2),
-                'negative_days_pct': round(monthly_stats.loc[month, 'negative'], 2),
-                'day_count': int(monthly_stats.loc[month, 'count'])
+    for month_number in range(1, 13):
+        if month_number in daily_stats:
+            stats = daily_stats[month_number]
+            monthly_results[month_number] = {
+                'mean_daily_change': stats['mean'],
+                'median_daily_change': stats['median'],
+                'positive_days_pct': stats['positive'],
+                'negative_days_pct': stats['negative'],
+                'day_count': stats['count']
             }
     
     return {
@@ -223,73 +316,96 @@ def analyze_monthly_patterns(df):
         'monthly_performance': month_performance
     }
 
+def month_columns(dates):
+    """
+    Calculate the calendar month and a year-month key of every date in one pass.
+    
+    Parameters:
+    dates (numpy.ndarray): datetime64 dates
+    
+    Returns:
+    dict: 'Year_Month' (months since January 1970) and 'Month' (1-12) arrays,
+          NaN for missing dates
+    """
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    year_months = np.where(np.isnat(dates), np.nan, months)
+    return {'Year_Month': year_months, 'Month': year_months % 12 + 1}
+
+def sign_columns(change):
+    """
+    Flag the positive and negative days.
+    
+    Parameters:
+    change (numpy.ndarray): Daily 'Change %' values
+    
+    Returns:
+    dict: 'Is_Positive' and 'Is_Negative' int8 arrays (a missing change is neither)
+    """
+    return {'Is_Positive': (change > 0).view(np.int8), 'Is_Negative': (change < 0).view(np.int8)}
+
 def analyze_volatility_clustering(df):
     """
     Analyze volatility clustering patterns.
     
     Parameters:
-    df (pandas.DataFrame): DataFrame with daily data
+    df (pandas.DataFrame): DataFrame with daily data in chronological order
     
     Returns:
     dict: Statistics about volatility patterns
     """
     results = {}
     
+    if 'Is_Positive' not in df.columns or 'Is_Negative' not in df.columns:
+        df = df.assign(**sign_columns(df['Change %'].to_numpy(dtype=np.float64)))
+    
     # Calculate absolute change as a measure of volatility
-    df['Abs_Change'] = df['Change %'].abs()
+    change = df['Change %'].to_numpy(dtype=np.float64)
+    abs_change = np.abs(change)
+    
+    # Define high volatility as days with absolute change above the 75th percentile;
+    # np.quantile selects it with a partial sort (missing changes are left out)
+    valid_abs_change = abs_change[~np.isnan(abs_change)]
+    if len(valid_abs_change) == 0:
+        return results
+    volatility_threshold = np.quantile(valid_abs_change, 0.75)
+    
+    # Count the high volatility days and tally the day after each of them; rows
+    # are in date order, so the next day of every day is the next row
+    if NUMBA_AVAILABLE:
+        (high_vol_days_count, next_day_high_vol_count, positive_count, negative_count,
+         positive_sum, negative_sum) = _volatility_outcomes(change, volatility_threshold)
+    else:
+        is_high_vol = abs_change > volatility_threshold
+        followed = is_high_vol[:-1]  # the last day has no next day
+        high_vol_days_count = int(np.count_nonzero(is_high_vol))
+        next_day_high_vol_count = int(np.count_nonzero(is_high_vol[1:][followed]))
+        
+        next_changes = change[1:][followed]
+        positive_next = next_changes[df['Is_Positive'].to_numpy(dtype=bool)[1:][followed]]
+        negative_next = next_changes[df['Is_Negative'].to_numpy(dtype=bool)[1:][followed]]
+        positive_count, positive_sum = len(positive_next), positive_next.sum()
+        negative_count, negative_sum = len(negative_next), negative_next.sum()
     
-    # Define high volatility as days with absolute change above the 75th percentile
-    volatility_threshold = df['Abs_Change'].quantile(0.75)
-    df['High_Volatility'] = df['Abs_Change'] > volatility_threshold
+    # Without high volatility days there is nothing to report
+    if high_vol_days_count == 0:
+        return results
     
     # Calculate probability of high volatility following high volatility
-    high_vol_days = df[df['High_Volatility']].index
-    next_day_high_vol_count = 0
-    
-    for idx in high_vol_days:
-        if idx + 1 in df.index and df.loc[idx + 1, 'High_Volatility']:
-            next_day_high_vol_count += 1
-    
-    if len(high_vol_days) > 0:
-        prob_high_vol_after_high_vol = (next_day_high_vol_count / len(high_vol_days)) * 100
-        results['volatility_clustering'] = {
-            'threshold': round(volatility_threshold, 2),
-            'prob_high_vol_after_high_vol': round(prob_high_vol_after_high_vol, 2),
-            'high_vol_days_count': len(high_vol_days),
-            'consecutive_high_vol_count': next_day_high_vol_count
-        }
-    
-    # Analyze what happens after volatile days
-    after_high_vol = {
-        'positive': {'count': 0, 'avg_change': []},
-        'negative': {'count': 0, 'avg_change': []}
+    prob_high_vol_after_high_vol = (next_day_high_vol_count / high_vol_days_count) * 100
+    results['volatility_clustering'] = {
+        'threshold': round(volatility_threshold, 2),
+        'prob_high_vol_after_high_vol': round(prob_high_vol_after_high_vol, 2),
+        'high_vol_days_count': high_vol_days_count,
+        'consecutive_high_vol_count': next_day_high_vol_count
     }
     
-    for idx in high_vol_days:
-        if idx + 1 in df.index:
-            next_change = df.loc[idx + 1, 'Change %']
-            
-            if next_change > 0:
-                after_high_vol['positive']['count'] += 1
-                after_high_vol['positive']['avg_change'].append(next_change)
-            elif next_change < 0:
-                after_high_vol['negative']['count'] += 1
-                after_high_vol['negative']['avg_change'].append(next_change)
-    
-    total_after_high_vol = after_high_vol['positive']['count'] + after_high_vol['negative']['count']
+    # Analyze what happens after volatile days
+    total_after_high_vol = positive_count + negative_count
     
     if total_after_high_vol > 0:
-        prob_positive_after_high_vol = (after_high_vol['positive']['count'] / total_after_high_vol) * 100
-        
-        avg_positive_after_high_vol = (
-            sum(after_high_vol['positive']['avg_change']) / len(after_high_vol['positive']['avg_change'])
-            if after_high_vol['positive']['avg_change'] else 0
-        )
-        
-        avg_negative_after_high_vol = (
-            sum(after_high_vol['negative']['avg_change']) / len(after_high_vol['negative']['avg_change'])
-            if after_high_vol['negative']['avg_change'] else 0
-        )
+        prob_positive_after_high_vol = (positive_count / total_after_high_vol) * 100
+        avg_positive_after_high_vol = np.float64(positive_sum) / positive_count if positive_count else 0
+        avg_negative_after_high_vol = np.float64(negative_sum) / negative_count if negative_count else 0
         
         results['after_high_volatility'] = {
             'prob_positive': round(prob_positive_after_high_vol, 2),
@@ -302,6 +418,43 @@ def analyze_volatility_clustering(df):
 
 
 
+@njit(cache=True)
+def _volatility_outcomes(changes, threshold):
+    """
+    Tally the high volatility days and what follows them in a single pass.
+    
+    Parameters:
+    changes (numpy.ndarray): Daily changes in chronological order
+    threshold (float): Absolute change above which a day is highly volatile
+    
+    Returns:
+    tuple: High volatility days, those followed by another high volatility day, and the
+           count and sum of the positive and of the negative days after one
+    """
+    high_vol_days = 0
+    consecutive_high_vol = 0
+    positive_count = 0
+    negative_count = 0
+    positive_sum = 0.0
+    negative_sum = 0.0
+    n = len(changes)
+    
+    for i in range(n):
+        if abs(changes[i]) > threshold:
+            high_vol_days += 1
+            if i + 1 < n:
+                next_change = changes[i + 1]
+                if abs(next_change) > threshold:
+                    consecutive_high_vol += 1
+                if next_change > 0:
+                    positive_count += 1
+                    positive_sum += next_change
+                elif next_change < 0:
+                    negative_count += 1
+                    negative_sum += next_change
+    
+    return high_vol_days, consecutive_high_vol, positive_count, negative_count, positive_sum, negative_sum
+
 def format_pattern_results(results):
     """
     Format the pattern analysis results into a readable string.
@@ -312,85 +465,79 @@ def format_pattern_results(results):
     Returns:
     str: Formatted string with analysis results
     """
-
-    output = """
+    # Start with the report heading; pieces are joined once at the end
+    parts = ["""
 <h>Pattern Analysis Report</h>
-"""
+"""]
     # 1. Consecutive Weeks Analysis
-    output += "Consecutive Weeks Patterns:\n"
-    output += "===========================\n"
+    parts.append("Consecutive Weeks Patterns:\n")
+    parts.append("===========================\n")
     
     if 'consecutive_weeks' in results:
+        consecutive_weeks = results['consecutive_weeks']
+        
         # First, collect all streak patterns that have at least one occurrence
         valid_patterns = []
         for streak_length in range(1, 11):  # Analyze streaks of length 1 to 10
-            pos_key = f"{streak_length}_positive"
-            neg_key = f"{streak_length}_negative"
-            
-            if pos_key in results['consecutive_weeks']:
-                valid_patterns.append((streak_length, 'positive'))
-            if neg_key in results['consecutive_weeks']:
-                valid_patterns.append((streak_length, 'negative'))
+            for streak_type in ('positive', 'negative'):
+                stats = consecutive_weeks.get(f"{streak_length}_{streak_type}")
+                if stats is not None:
+                    valid_patterns.append((streak_length, streak_type, stats))
         
         if valid_patterns:
             # Create a table header
-            output += "| STREAK PATTERN                | OCCURRENCES | NEXT WEEK AVG CHANGE |\n"
-            output += "|-------------------------------|------------|---------------------|\n"
+            parts.append("| STREAK PATTERN                | OCCURRENCES | NEXT WEEK AVG CHANGE |\n")
+            parts.append("|-------------------------------|------------|---------------------|\n")
             
             # Display each valid pattern
-            for streak_length, streak_type in valid_patterns:
-                key = f"{streak_length}_{streak_type}"
-                stats = results['consecutive_weeks'][key]
-                
+            for streak_length, streak_type, stats in valid_patterns:
                 pattern_name = f"{streak_length} consecutive {streak_type} {'week' if streak_length == 1 else 'weeks'}"
                 occurrences = stats['count']
                 avg_change = stats['avg_next_change']
                 
-                output += f"| {pattern_name:<29} | {occurrences:^10} | {avg_change:^19.2f}% |\n"
+                parts.append(f"| {pattern_name:<29} | {occurrences:^10} | {avg_change:^19.2f}% |\n")
             
-            output += "|-------------------------------|------------|---------------------|\n"
+            parts.append("|-------------------------------|------------|---------------------|\n")
         else:
-            output += "No consecutive week patterns found in the data.\n"
+            parts.append("No consecutive week patterns found in the data.\n")
     
     # 3. Monthly Patterns
-    output += "Monthly Patterns:\n"
-    output += "================\n"
+    parts.append("Monthly Patterns:\n")
+    parts.append("================\n")
     
     if 'monthly' in results and 'monthly_performance' in results['monthly']:
-        month_order = [
-            'January', 'February', 'March', 'April', 'May', 'June',
-            'July', 'August', 'September', 'October', 'November', 'December'
-        ]
+        monthly_performance = results['monthly']['monthly_performance']
         
-        for month in month_order:
-            if month in results['monthly']['monthly_performance']:
-                stats = results['monthly']['monthly_performance'][month]
-                output += f"{month}:\n"
-                output += f"  Average monthly return: {stats['avg_monthly_return']}%\n"
-                output += f"  Positive months: {stats['positive_months']}%\n"
-                output += f"  Negative months: {stats['negative_months']}%\n"
-                output += f"  Sample size: {stats['count']} months\n\n"
+        for month_number, month in enumerate(MONTH_NAMES, start=1):
+            stats = monthly_performance.get(month_number)
+            if stats is not None:
+                parts.append(f"{month}:\n")
+                parts.append(f"  Average monthly return: {stats['avg_monthly_return']}%\n")
+                parts.append(f"  Positive months: {stats['positive_months']}%\n")
+                parts.append(f"  Negative months: {stats['negative_months']}%\n")
+                parts.append(f"  Sample size: {stats['count']} months\n\n")
     
     # 4. Volatility Clustering
-    output += "Volatility Patterns:\n"
-    output += "===================\n"
+    parts.append("Volatility Patterns:\n")
+    parts.append("===================\n")
     
     if 'volatility' in results:
-        if 'volatility_clustering' in results['volatility']:
-            stats = results['volatility']['volatility_clustering']
-            output += f"Volatility threshold (75th percentile): {stats['threshold']}%\n"
-            output += f"Probability of high volatility after high volatility: {stats['prob_high_vol_after_high_vol']}%\n"
-            output += f"Number of high volatility days: {stats['high_vol_days_count']}\n"
-            output += f"Number of consecutive high volatility days: {stats['consecutive_high_vol_count']}\n\n"
+        volatility = results['volatility']
+        if 'volatility_clustering' in volatility:
+            stats = volatility['volatility_clustering']
+            parts.append(f"Volatility threshold (75th percentile): {stats['threshold']}%\n")
+            parts.append(f"Probability of high volatility after high volatility: {stats['prob_high_vol_after_high_vol']}%\n")
+            parts.append(f"Number of high volatility days: {stats['high_vol_days_count']}\n")
+            parts.append(f"Number of consecutive high volatility days: {stats['consecutive_high_vol_count']}\n\n")
         
-        if 'after_high_volatility' in results['volatility']:
-            stats = results['volatility']['after_high_volatility']
-            output += "After high volatility days:\n"
-            output += f"  Probability of positive day: {stats['prob_positive']}%\n"
-            output += f"  Probability of negative day: {stats['prob_negative']}%\n"
-            output += f"  Average positive change: {stats['avg_positive_change']}%\n"
-            output += f"  Average negative change: {stats['avg_negative_change']}%\n\n"
+        if 'after_high_volatility' in volatility:
+            stats = volatility['after_high_volatility']
+            parts.append("After high volatility days:\n")
+            parts.append(f"  Probability of positive day: {stats['prob_positive']}%\n")
+            parts.append(f"  Probability of negative day: {stats['prob_negative']}%\n")
+            parts.append(f"  Average positive change: {stats['avg_positive_change']}%\n")
+            parts.append(f"  Average negative change: {stats['avg_negative_change']}%\n\n")
     
     # Price Level Analysis section has been removed
     
-    return output
+    return "".join(parts)